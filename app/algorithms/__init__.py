@@ -1,14 +1,30 @@
+from functools import partial
+
 from algorithms.olc import olc_suffix, olc_dynamic, olc, olc_naive
+from algorithms.compact_graph import CompactGraph
 from algorithms.scs import scs, greedy_scs
 from algorithms.de_bruijn import do_assembly as de_bruijn
+from algorithms.packed_de_bruijn import PackedDeBruijnGraph
 
 
 algorithms = {
     'SCS': scs,
     'GREEDY_SCS': greedy_scs,
     'DE_BRUIJN': de_bruijn,
+    'DE_BRUIJN_PACKED': partial(de_bruijn, graph_type=PackedDeBruijnGraph),
+    'DE_BRUIJN_AUTO': partial(de_bruijn, k=None),
     'OLC_NAIVE': olc_naive,
     'OLC': olc,
+    'OLC_COMPACT': partial(olc, graph_type=CompactGraph),
     'OLC_SUFFIX': olc_suffix,
     'OLC_DYNAMIC': olc_dynamic,
 }
+
+# algorithms accepting `workers` argument
+parallel_algorithms = {'OLC_NAIVE', 'OLC', 'OLC_COMPACT', 'OLC_DYNAMIC'}
+
+# algorithms accepting `cache` argument
+cached_algorithms = {'OLC_NAIVE', 'OLC', 'OLC_COMPACT', 'OLC_SUFFIX', 'OLC_DYNAMIC'}
+
+# algorithms accepting `pairs` argument, scaffolding contigs with mates
+paired_algorithms = {'OLC', 'OLC_COMPACT', 'OLC_SUFFIX', 'OLC_DYNAMIC'}
@@ -0,0 +1,234 @@
+import random
+from bisect import bisect_left
+from typing import Sequence, Iterator, Tuple
+
+import numpy as np
+
+from algorithms.olc import Graph
+from read_store import ReadStore
+
+
+class CompactGraph(Graph):
+    """ Overlap graph with adjacency kept in typed arrays (CSR). Edges
+        are stored once, sorted by source, with a second index of edges
+        sorted by target. Removal only clears alive flags (a byte per node
+        and per edge end), so the graph is built once from an edge list and
+        then only shrinks. Edge between two nodes is found by binary search
+        over neighbours of a node sorted by id.
+
+        Has the same API as `Graph` apart from adding nodes, nodes are
+        light views with ids 0..n-1. As in `Graph`, removing a node
+        drops its edges from neighbours only, the removed node still sees
+        its own edges. """
+
+    def __init__(self, reads: Sequence[str], edges: Sequence[Tuple[int, int, int]]):
+        self.values = ReadStore.from_reads(reads)
+        n = len(self.values)
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 3)
+        order = np.argsort(edges[:, 0], kind='stable')
+        self.sources = edges[order, 0].astype(np.int32)
+        self.targets = edges[order, 1].astype(np.int32)
+        self.weights = edges[order, 2].astype(np.int32)
+        self.out_offsets = np.searchsorted(self.sources, np.arange(n + 1)).astype(np.int64)
+        position_of_edge = np.empty(len(order), dtype=np.int64)
+        position_of_edge[order] = np.arange(len(order))
+        self.in_edges = position_of_edge[np.argsort(edges[:, 1], kind='stable')]
+        self.in_offsets = np.searchsorted(self.targets[self.in_edges], np.arange(n + 1)).astype(np.int64)
+        # edges of every node sorted by neighbour, within the same offsets
+        self.out_lookup = np.lexsort((self.targets, self.sources))
+        self.out_lookup_keys = self.targets[self.out_lookup]
+        self.in_lookup = np.lexsort((self.sources, self.targets))
+        self.in_lookup_keys = self.sources[self.in_lookup]
+        self.alive = np.ones(n, dtype=np.bool_)
+        self.out_alive = np.ones(len(order), dtype=np.bool_)
+        self.in_alive = np.ones(len(order), dtype=np.bool_)
+        self.out_degree = np.diff(self.out_offsets)
+        self.in_degree = np.diff(self.in_offsets)
+        self.number_of_nodes = n
+        self.sorted_out = {}
+        # memoryviews index to Python scalars much faster than arrays, and see changes of alive flags
+        self.lookups = {
+            incoming: tuple(map(memoryview, arrays)) for incoming, arrays in (
+                (False, (self.out_offsets, self.out_lookup_keys, self.out_lookup, self.out_alive)),
+                (True, (self.in_offsets, self.in_lookup_keys, self.in_lookup, self.in_alive)),
+            )
+        }
+
+    @classmethod
+    def from_edges(cls, reads: Sequence[str], edges: Sequence[Tuple[int, int, int]]) -> 'CompactGraph':
+        return cls(reads, edges)
+
+    def add_node(self, node):
+        raise TypeError("CompactGraph is built at once with from_edges, nodes cannot be added")
+
+    def __iter__(self) -> Iterator['CompactNode']:
+        return (CompactNode(self, node_id) for node_id in np.flatnonzero(self.alive).tolist())
+
+    def __len__(self):
+        return self.number_of_nodes
+
+    def __bool__(self):
+        return bool(self.number_of_nodes)
+
+    def __getitem__(self, item: int or 'CompactNode') -> 'CompactNode':
+        node_id = item if isinstance(item, int) else item.id
+        if not 0 <= node_id < len(self.alive) or not self.alive[node_id]:
+            raise KeyError(node_id)
+        return CompactNode(self, node_id)
+
+    def remove_node(self, node: int or 'CompactNode'):
+        node = self[node]
+        self.alive[node.id] = False
+        self.number_of_nodes -= 1
+        out_edges = node.out.edges
+        self.in_alive[out_edges] = False
+        np.subtract.at(self.in_degree, self.targets[out_edges], 1)
+        in_edges = node.entries.edges
+        self.out_alive[in_edges] = False
+        np.subtract.at(self.out_degree, self.sources[in_edges], 1)
+
+    def remove_edges(self, edges: Sequence[Tuple[int, int]]):
+        """ Clear alive flags of all given (source, target) edges at once """
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        n = len(self.alive)
+        removed = np.isin(self.sources.astype(np.int64) * n + self.targets, edges[:, 0] * n + edges[:, 1])
+        removed &= self.out_alive & self.in_alive
+        self.out_alive[removed] = False
+        self.in_alive[removed] = False
+        self.out_degree -= np.bincount(self.sources[removed], minlength=n)
+        self.in_degree -= np.bincount(self.targets[removed], minlength=n)
+        self.sorted_out.clear()
+
+    def get_random_node(self) -> 'CompactNode':
+        return CompactNode(self, random.choice(np.flatnonzero(self.alive).tolist()))
+
+    def get_node_greatest_number_of_out(self) -> 'CompactNode':
+        return CompactNode(self, int(np.argmax(np.where(self.alive, self.out_degree, -1))))
+
+    def get_node_with_smallest_number_of_entries(self) -> 'CompactNode':
+        return CompactNode(self, int(np.argmin(np.where(self.alive, self.in_degree, np.iinfo(np.int64).max))))
+
+    @property
+    def average_node_value_length(self):
+        return float(self.values.lengths[self.alive].mean())
+
+
+class CompactNode:
+    """ View of a node of `CompactGraph` """
+    __slots__ = ('graph', 'id')
+
+    def __init__(self, graph: CompactGraph, node_id: int):
+        self.graph = graph
+        self.id = node_id
+
+    @property
+    def value(self) -> str:
+        return self.graph.values[self.id]
+
+    @property
+    def out(self) -> 'Adjacency':
+        return Adjacency(self.graph, self.id, incoming=False)
+
+    @property
+    def entries(self) -> 'Adjacency':
+        return Adjacency(self.graph, self.id, incoming=True)
+
+    def get_next_node_id_and_overlap(self):
+        return max(self.out.items(), key=lambda x: x[1])
+
+    @property
+    def has_out(self) -> bool:
+        return bool(self.graph.out_degree[self.id])
+
+    @property
+    def out_nodes_sorted_by_value(self):
+        """ Computed once per node, like cached property of `Node` """
+        if self.id not in self.graph.sorted_out:
+            self.graph.sorted_out[self.id] = [
+                key for key, item in sorted(self.out.items(), key=lambda x: x[1], reverse=True)
+            ]
+        return self.graph.sorted_out[self.id]
+
+    def __eq__(self, other: 'CompactNode'):
+        return self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+
+class Adjacency:
+    """ Dict-like view {neighbour id: overlap} of live out edges or
+        entries of a node """
+    __slots__ = ('graph', 'node_id', 'incoming')
+
+    def __init__(self, graph: CompactGraph, node_id: int, incoming: bool):
+        self.graph = graph
+        self.node_id = node_id
+        self.incoming = incoming
+
+    @property
+    def edges(self) -> np.ndarray:
+        """ Indices of live edges, in insertion order """
+        graph = self.graph
+        if self.incoming:
+            edges = graph.in_edges[graph.in_offsets[self.node_id]:graph.in_offsets[self.node_id + 1]]
+            return edges[graph.in_alive[edges]]
+        edges = np.arange(graph.out_offsets[self.node_id], graph.out_offsets[self.node_id + 1])
+        return edges[graph.out_alive[edges]]
+
+    def _neighbours(self, edges: np.ndarray) -> np.ndarray:
+        return self.graph.sources[edges] if self.incoming else self.graph.targets[edges]
+
+    def _edge(self, node_id: int) -> int or None:
+        """ Live edge to or from node_id, binary searched among edges of
+            this node sorted by neighbour """
+        offsets, keys, lookup, alive = self.graph.lookups[self.incoming]
+        end = offsets[self.node_id + 1]
+        position = bisect_left(keys, node_id, offsets[self.node_id], end)
+        while position < end and keys[position] == node_id:
+            edge = lookup[position]
+            if alive[edge]:
+                return edge
+            position += 1
+        return None
+
+    def keys(self) -> [int]:
+        return self._neighbours(self.edges).tolist()
+
+    def values(self) -> [int]:
+        return self.graph.weights[self.edges].tolist()
+
+    def items(self) -> [Tuple[int, int]]:
+        edges = self.edges
+        return list(zip(self._neighbours(edges).tolist(), self.graph.weights[edges].tolist()))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        degree = self.graph.in_degree if self.incoming else self.graph.out_degree
+        return int(degree[self.node_id])
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, node_id: int):
+        return self._edge(node_id) is not None
+
+    def __getitem__(self, node_id: int) -> int:
+        edge = self._edge(node_id)
+        if edge is None:
+            raise KeyError(node_id)
+        return int(self.graph.weights[edge])
+
+    def pop(self, node_id: int) -> int:
+        edge = self._edge(node_id)
+        if edge is None:
+            raise KeyError(node_id)
+        if self.incoming:
+            self.graph.in_alive[edge] = False
+            self.graph.in_degree[self.node_id] -= 1
+        else:
+            self.graph.out_alive[edge] = False
+            self.graph.out_degree[self.node_id] -= 1
+        return int(self.graph.weights[edge])
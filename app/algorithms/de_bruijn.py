@@ -1,7 +1,10 @@
+import logging
 from typing import Sequence
 
 from algorithms.error_corrections import CorrectedReads
+from algorithms.kmers import choose_k
 from io_utils import parse_input
+from profiling import counter, stage
 
 
 class DeBruijnGraph:
@@ -66,46 +69,75 @@ class DeBruijnGraph:
         """ Return true iff graph has Eulerian path or cycle """
         return self.has_eulerian_path() or self.has_eulerian_cycle()
 
+    @property
+    def number_of_edges(self) -> int:
+        """ Edges counted with multiplicity, one per k-mer occurrence """
+        return sum(map(len, self.graph.values()))
+
     def eulerian_path(self):
-        """ Find and return Eulerian path or cycle (as appropriate) """
+        """ Find and return Eulerian path or cycle (as appropriate), with
+            iterative Hierholzer's algorithm not modifying the graph """
         assert self.is_eulerian()
         graph = self.graph
-        if self.has_eulerian_path():
-            graph = graph.copy()
-            assert self.head is not None
-            assert self.tail is not None
-            graph.setdefault(self.tail, []).append(self.head)
-        # graph graph has an Eulerian cycle
+        # Path starts at head, cycle at arbitrary node and ends with it again
+        src = self.head if self.has_eulerian_path() else next(iter(graph.keys()))
+        remaining = {node: len(neighbours) for node, neighbours in graph.items()}
         tour = []
-        src = next(iter(graph.keys()))  # pick arbitrary starting node
-
-        def __visit(node):
-            while len(graph[node]) > 0:
-                dst = graph[node].pop()
-                __visit(dst)
-            tour.append(node)
-
-        __visit(src)
-        tour = tour[::-1][:-1]
-
-        if self.has_eulerian_path():
-            # Adjust node list so that it starts at head and ends at tail
-            sti = tour.index(self.head)
-            tour = tour[sti:] + tour[:sti]
+        stack = [src]
+        while stack:
+            node = stack[-1]
+            left = remaining.get(node, 0)
+            if left:
+                remaining[node] = left - 1
+                stack.append(graph[node][left - 1])
+            else:
+                tour.append(stack.pop())
+        tour.reverse()
+        if self.has_eulerian_cycle():
+            tour.pop()
 
         # Return node list
-        return map(str, tour)
+        return map(self._label, tour)
+
+    def _label(self, node: 'Node') -> str:
+        return node.km1mer
 
     @property
     def super_string(self):
         if not self._super_string:
-            for point in self.eulerian_path():
-                if not self._super_string:
-                    self._super_string = point
-                else:
-                    self._super_string += point[-1]
+            path = self.eulerian_path()
+            first = next(path)
+            self._super_string = first + ''.join(point[-1] for point in path)
         return self._super_string
 
+    def unitigs(self) -> [str]:
+        """ Strings of maximal non-branching paths of graph with repeated
+            edges merged, every distinct k-mer is used by one unitig """
+        successors = {node: list(dict.fromkeys(neighbours)) for node, neighbours in self.graph.items()}
+        in_degree = {}
+        for neighbours in successors.values():
+            for node in neighbours:
+                in_degree[node] = in_degree.get(node, 0) + 1
+
+        def one_in_one_out(node):
+            return in_degree.get(node, 0) == 1 and len(successors.get(node, ())) == 1
+
+        unitigs = []
+        visited = set()
+        for node, neighbours in successors.items():
+            if not one_in_one_out(node):
+                unitigs.extend(_walk(node, following, successors, one_in_one_out, visited) for following in neighbours)
+        # What is left are isolated cycles of non-branching nodes
+        for node in successors:
+            if node not in visited and one_in_one_out(node):
+                visited.add(node)
+                unitigs.append(_walk(node, successors[node][0], successors, one_in_one_out, visited))
+        return unitigs
+
+    def contigs(self) -> [str]:
+        """ Super string if graph is Eulerian, unitigs otherwise """
+        return [self.super_string] if self.is_eulerian() else self.unitigs()
+
 
 class Node:
     """ Node in a de Bruijn graph, representing a k-1 mer.  We keep
@@ -130,24 +162,49 @@ class Node:
         return self.km1mer
 
 
-def do_assembly(data: Sequence[str]):
-    graph = DeBruijnGraph(data, 10)
-    return graph.super_string
+def _walk(node, following, successors, one_in_one_out, visited) -> str:
+    """ String of path from node through following node and on through
+        non-branching nodes not visited yet """
+    parts = [node.km1mer]
+    while True:
+        parts.append(following.km1mer[-1])
+        if not one_in_one_out(following) or following in visited:
+            return ''.join(parts)
+        visited.add(following)
+        following = successors[following][0]
+
+
+def do_assembly(data: Sequence[str], graph_type=None, k=10):
+    """ With k None, k is chosen from k-mer spectra of reads. Not yet
+        corrected reads are then corrected with that k and threshold. """
+    if k is None:
+        with stage('choose_k'):
+            data, k = _with_chosen_k(data)
+    counter('k', k)
+    with stage('graph'):
+        graph = (graph_type or DeBruijnGraph)(data, k)
+        counter('graph_nodes', len(graph.nodes))
+        counter('graph_edges', graph.number_of_edges)
+    with stage('contigs'):
+        return graph.contigs()
+
+
+def _with_chosen_k(data: Sequence[str]):
+    reads = data.reads if isinstance(data, CorrectedReads) else data
+    spectrum = choose_k(reads)
+    logging.info(f"Chosen k={spectrum.k}, solid k-mers occur more than {spectrum.threshold} times")
+    if isinstance(data, CorrectedReads) and data.corrections is None:
+        data = CorrectedReads(reads, k=spectrum.k, threshold=spectrum.threshold,
+                              canonical=data.canonical, workers=data.workers, cache=data.cache)
+    return data, spectrum.k
 
 
 if __name__ == '__main__':
     # DEBUG
 
     list_graph = DeBruijnGraph(["konstantynopoli", "politanczykowianeczka"], 5)
-    print(list_graph.super_string)
+    print(list_graph.contigs())
 
+    logging.basicConfig(level=logging.DEBUG)
     data = parse_input('./sample_data/reads_1_percent_bad.fasta')
-    for i in range(10, 20):
-        corrected_reads = CorrectedReads(data, k=i, threshold=5)
-        try:
-            print(f"Trying {i}...")
-            graph = DeBruijnGraph(corrected_reads, i)
-            print(graph.super_string)
-            print(f"Success!!!!!!!!!! {i}")
-        except Exception:
-            pass
+    print(do_assembly(CorrectedReads(data), k=None))
@@ -1,44 +1,117 @@
 import collections
-import itertools
-from typing import Sequence, Iterator
+from contextlib import closing
+from typing import Sequence, Iterator, Tuple
 
+import numpy as np
 from cached_property import cached_property
 
+from algorithms.kmers import KmerHistogram, pack_windows
+from cache import cache_key, reads_digest
+from parallel import parallel_map, shards, shared
+from profiling import counter, stage
+from progress import track
+from read_store import ReadStore, ENCODING, frozen_buffer
+
+BASES = b'ACGT'
+CODES = bytes(ENCODING)
+
+CorrectionStatistics = collections.namedtuple('CorrectionStatistics', [
+    'reads',
+    'corrected_reads',
+    'corrections',
+])
+
 
 class CorrectedReads:
-    def __init__(self, reads: Sequence[str], k=10, threshold=2):
+    def __init__(self, reads: Sequence[str], k=10, threshold=2, canonical=False, workers=1, cache=None):
         """
         :param reads: sequence of reads
         :param k: k-mer length
         :param threshold: if k-mer occur more often than threshold value,
                k-mer is considered correct. \n
                **Use higher values to replace k-mer more likely**
+        :param canonical: count k-mer together with its reverse complement
+        :param workers: number of processes correcting reads
+        :param cache: `Cache` of histogram and corrected reads
         """
-        self.reads = reads
+        self.reads = ReadStore.from_reads(reads)
         self.k = k
         self.threshold = threshold
+        self.canonical = canonical
+        self.workers = workers
+        self.cache = cache
+        self.corrections = None
 
     def __iter__(self) -> Iterator[Sequence[str]]:
         return iter(self.corrected_reads)
 
     @cached_property
-    def corrected_reads(self):
-        result = []
-        for read in self.reads:
-            result.append(self.correct1mm(read))
-        return result
+    def corrected_reads(self) -> ReadStore:
+        with stage('error_correction'):
+            if self.cache is None:
+                corrected = self._correct_reads()
+            else:
+                key = cache_key('corrected_reads', self.k, self.threshold, self.canonical, self.digest)
+                corrected = self.cache.fetch(key, self._correct_reads)
+            self.corrections = corrected['corrections']
+            counter('corrected_reads', int(np.count_nonzero(self.corrections)))
+            counter('corrections', int(self.corrections.sum()))
+        return ReadStore(corrected['buffer'], corrected['offsets'], self.reads.names)
+
+    @cached_property
+    def digest(self) -> str:
+        return reads_digest(self.reads)
+
+    def _correct_reads(self):
+        """ Correct all reads in one mutable copy of the read buffer,
+            reads without infrequent k-mers are not touched at all """
+        offsets = self.reads.offsets
+        begin = int(offsets[0])
+        buffer = bytearray(self.reads.buffer[begin:int(offsets[-1])])
+        corrections = np.zeros(len(self.reads), dtype=np.int64)
+        self.histogram  # built before workers start, so they share it
+        to_correct = list(self._first_infrequent_kmers())
+        read_shards = shards(len(to_correct), self.workers)
+        results = parallel_map(_correct_shard, read_shards, self.workers, corrected_reads=self, to_correct=to_correct)
+        with closing(results), track(len(to_correct), 'Correcting reads') as progress:
+            for (_, stop), corrected in zip(read_shards, results):
+                progress.update(stop)
+                for read_number, read, read_corrections in corrected:
+                    buffer[int(offsets[read_number]) - begin:int(offsets[read_number + 1]) - begin] = read
+                    corrections[read_number] = read_corrections
+        return {
+            'buffer': frozen_buffer(buffer),
+            'offsets': offsets - begin,
+            'corrections': corrections,
+        }
+
+    @cached_property
+    def statistics(self) -> CorrectionStatistics:
+        """ Number of reads, corrected reads and corrected bases """
+        self.corrected_reads  # corrections are counted while correcting
+        return CorrectionStatistics(
+            reads=len(self.reads),
+            corrected_reads=int(np.count_nonzero(self.corrections)),
+            corrections=int(self.corrections.sum()),
+        )
 
     @cached_property
     def alphabet(self):
-        return set(itertools.chain.from_iterable(self.reads))
+        return sorted(self.reads.alphabet)
 
     @cached_property
-    def histogram(self):
+    def histogram(self) -> KmerHistogram:
         """ Build k-mer histogram and average # k-mer occurrences """
-        histogram = {}
-        for read in self.reads:
-            for kmer in [read[i:i + self.k] for i in range(len(read) - (self.k - 1))]:
-                histogram[kmer] = histogram.get(kmer, 0) + 1
+        with stage('kmer_histogram'):
+            if self.cache is None:
+                histogram = KmerHistogram(self.reads, self.k, canonical=self.canonical)
+            else:
+                def count_kmers():
+                    histogram = KmerHistogram(self.reads, self.k, canonical=self.canonical)
+                    return {'kmers': histogram.kmers, 'counts': histogram.counts}
+                counted = self.cache.fetch(cache_key('histogram', self.k, self.canonical, self.digest), count_kmers)
+                histogram = KmerHistogram.from_counts(counted['kmers'], counted['counts'], self.k, self.canonical)
+            counter('distinct_kmers', len(histogram.kmers))
         return histogram
 
     def plot_histogram(self):
@@ -53,22 +126,76 @@ class CorrectedReads:
         pyplot.plot(x, y)
         pyplot.show()
 
+    def _first_infrequent_kmers(self) -> Iterator[Tuple[int, int]]:
+        """ Generate (read number, position of first infrequent k-mer) for
+            reads having any, all k-mers are looked up at once """
+        packed, valid = pack_windows(self.reads, self.k, canonical=self.canonical)
+        offsets = self.reads.offsets - self.reads.offsets[0]
+        positions = np.arange(len(packed))
+        read_numbers = np.searchsorted(offsets, positions, side='right') - 1
+        inside = positions + self.k <= offsets[np.minimum(read_numbers + 1, len(self.reads))]
+        counts = np.where(valid, self.histogram.lookup(packed), 0)
+        infrequent = np.flatnonzero(inside & (counts <= self.threshold))
+        reads_with_infrequent, first = np.unique(read_numbers[infrequent], return_index=True)
+        starts = infrequent[first] - offsets[reads_with_infrequent]
+        return zip(reads_with_infrequent.tolist(), starts.tolist())
+
     def correct1mm(self, read):
         """ Return an error-corrected version of read. """
-        # Iterate over k-mers in read
-        for i in range(len(read) - (self.k - 1)):
-            kmer = read[i:i + self.k]
-            # If k-mer is infrequent...
-            if self.histogram.get(kmer, 0) <= self.threshold:
-                # Look for a frequent neighbor
-                for new_kmer in self.neighbors1mm(kmer):
-                    if self.histogram.get(new_kmer, 0) > self.threshold:
-                        # Found a frequent neighbor; replace old kmer
-                        # with neighbor
-                        read = read[:i] + new_kmer + read[i + self.k:]
-                        break
-        # Return possibly-corrected read
-        return read
+        buffer = bytearray(read.encode())
+        self._correct(buffer, 0, len(buffer))
+        return buffer.decode()
+
+    def _correct_read(self, read_number: int, start: int) -> Tuple[int, bytes, int]:
+        buffer = bytearray(self.reads.view(read_number))
+        corrections = self._correct(buffer, 0, len(buffer), start)
+        return read_number, bytes(buffer), corrections
+
+    def _correct(self, buffer: bytearray, begin: int, end: int, start: int = 0) -> int:
+        """ Correct read buffer[begin:end] in place, k-mers are checked from
+            `start` on, return number of corrected bases """
+        k, threshold, count = self.k, self.threshold, self.histogram.count
+        mask = (1 << 2 * k) - 1
+        codes = buffer[begin:end].translate(CODES)
+        invalid_positions = [q for q, code in enumerate(codes) if code > 3]
+        corrections = 0
+        packed = 0
+        for q in range(start, len(codes)):
+            packed = ((packed << 2) | (codes[q] & 3)) & mask
+            i = q - (k - 1)
+            if i < start:
+                continue
+            invalid = [j - i for j in invalid_positions if i <= j <= q] if invalid_positions else []
+            if not invalid and count(packed) > threshold:
+                continue
+            # If k-mer is infrequent, look for a frequent neighbor
+            position, code = self._frequent_neighbor(packed, invalid)
+            if position is not None:
+                shift = 2 * (k - 1 - position)
+                packed = (packed & ~(3 << shift)) | (code << shift)
+                buffer[begin + i + position] = BASES[code]
+                corrections += 1
+                if invalid:
+                    invalid_positions.remove(i + position)
+        return corrections
+
+    def _frequent_neighbor(self, packed: int, invalid: [int]) -> Tuple[int or None, int or None]:
+        """ Find (position, base code) of a single substitution making packed
+            k-mer frequent, by bit-flips of its 2-bit codes. Positions are
+            tried from the last one, bases in ACGT order. With a symbol
+            other than ACGT only that one position can be replaced. """
+        if len(invalid) > 1:
+            return None, None
+        positions = invalid or range(self.k - 1, -1, -1)
+        for position in positions:
+            shift = 2 * (self.k - 1 - position)
+            old_code = (packed >> shift) & 3
+            for code in range(4):
+                if code == old_code and not invalid:
+                    continue
+                if self.histogram.count(packed ^ ((old_code ^ code) << shift)) > self.threshold:
+                    return position, code
+        return None, None
 
     def neighbors1mm(self, kmer):
         """ Generate all neighbors at Hamming distance 1 from kmer """
@@ -80,3 +207,8 @@ class CorrectedReads:
                     continue
                 neighbors.append(kmer[:j] + c + kmer[j + 1:])
         return neighbors
+
+
+def _correct_shard(shard: Tuple[int, int]) -> [Tuple[int, bytes, int]]:
+    corrected_reads, to_correct = shared('corrected_reads'), shared('to_correct')
+    return [corrected_reads._correct_read(read_number, start) for read_number, start in to_correct[slice(*shard)]]
@@ -0,0 +1,211 @@
+from bisect import bisect_left
+from collections import namedtuple
+from collections.abc import Mapping
+from typing import Sequence, Iterator
+
+import numpy as np
+
+from read_store import ReadStore, ENCODING
+
+MAX_K = 32
+CHUNK_BASES = 1 << 24
+SAMPLE_BASES = 1 << 22
+CANDIDATE_KS = range(11, MAX_K, 2)
+TO_DIGITS = str.maketrans('ACGTacgt', '01230123')
+FROM_DIGITS = str.maketrans('0123', 'ACGT')
+
+
+def encode(kmer: str) -> int or None:
+    """ Pack k-mer into int, 2 bits per base, None if it has other symbols """
+    digits = kmer.translate(TO_DIGITS)
+    try:
+        return int(digits, 4) if digits.isdigit() else None
+    except ValueError:
+        return None
+
+
+def decode(packed: int, k: int) -> str:
+    return np.base_repr(packed, 4).zfill(k).translate(FROM_DIGITS)
+
+
+def reverse_complement(packed: int, k: int) -> int:
+    result = 0
+    for _ in range(k):
+        result = (result << 2) | (3 - (packed & 3))
+        packed >>= 2
+    return result
+
+
+def pack_windows(reads: ReadStore, k: int, start: int = 0, stop: int = None, canonical=False):
+    """ Packed k-mers starting at every position of reads[start:stop],
+        rolled over the whole buffer at once. Returns packed k-mers and
+        a mask of k-mers fully inside one read and made of ACGT only """
+    assert 0 < k <= MAX_K
+    codes, valid = _windows(reads, start, stop)
+    n = max(len(codes) - (k - 1), 0)
+    codes = (codes & 3).astype(np.uint64)
+    packed = _pack(codes, k, n)
+    if canonical:
+        complement = np.zeros(n, dtype=np.uint64)
+        for j in range(k - 1, -1, -1):
+            complement = (complement << np.uint64(2)) | (np.uint64(3) - codes[j:j + n])
+        packed = np.minimum(packed, complement)
+    return packed, valid(k, n)
+
+
+def _pack(codes: np.ndarray, k: int, n: int) -> np.ndarray:
+    """ k-mers starting at first n positions of 2-bit codes, packed """
+    packed = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        packed = (packed << np.uint64(2)) | codes[j:j + n]
+    return packed
+
+
+def _windows(reads: ReadStore, start: int = 0, stop: int = None):
+    """ Codes of bases of reads[start:stop] and function giving mask of
+        valid first n windows of length k """
+    stop = len(reads) if stop is None else stop
+    begin, end = int(reads.offsets[start]), int(reads.offsets[stop])
+    codes = ENCODING[reads.buffer[begin:end]]
+    invalid = np.concatenate(([0], np.cumsum(codes == 255)))
+    lengths = np.diff(reads.offsets[start:stop + 1])
+    read_ends = np.repeat(reads.offsets[start + 1:stop + 1] - begin, lengths)
+
+    def valid(k: int, n: int) -> np.ndarray:
+        return (invalid[k:k + n] == invalid[:n]) & (np.arange(n) + k <= read_ends[:n])
+    return codes, valid
+
+
+def pack_kmers(reads: ReadStore, k: int, start: int = 0, stop: int = None, canonical=False) -> np.ndarray:
+    """ Packed k-mers of reads[start:stop], k-mers crossing read ends or
+        with symbols other than ACGT are dropped """
+    packed, valid = pack_windows(reads, k, start, stop, canonical)
+    return packed[valid]
+
+
+KmerSpectrum = namedtuple('KmerSpectrum', ['k', 'threshold', 'solid_kmers'])
+
+
+def sample_reads(reads: ReadStore, sample_bases: int = SAMPLE_BASES) -> ReadStore:
+    """ Every n-th read, so that sample has about sample_bases bases """
+    step = -(-int(reads.lengths.sum()) // sample_bases)
+    return reads[::step] if step > 1 else reads
+
+
+def kmer_spectra(reads: Sequence[str], ks: Sequence[int]) -> [KmerSpectrum]:
+    """ Spectra of several k counted from one packing of the longest
+        k-mers, shorter k-mers are their prefixes. The buffer is padded
+        so that a longest window starts at every position, also within
+        the last longest - 1 bases. k-mers are split into
+        erroneous and solid ones at the first valley of k-mer spectrum
+        (number of k-mers occurring given number of times), k-mers
+        occurring more often than threshold are solid. Without a valley
+        only k-mers occurring once are considered erroneous. """
+    reads = ReadStore.from_reads(reads)
+    longest = max(ks)
+    codes, valid = _windows(reads)
+    padded = np.concatenate(((codes & 3).astype(np.uint64), np.zeros(longest - 1, dtype=np.uint64)))
+    packed = _pack(padded, longest, len(codes))
+    spectra = []
+    for k in ks:
+        n = max(len(codes) - (k - 1), 0)
+        prefixes = packed[:n][valid(k, n)] >> np.uint64(2 * (longest - k))
+        counts = np.unique(prefixes, return_counts=True)[1]
+        frequencies = np.bincount(counts, minlength=2)
+        rising = np.flatnonzero(frequencies[2:] > frequencies[1:-1])
+        threshold = int(rising[0]) + 1 if len(rising) else 1
+        spectra.append(KmerSpectrum(k, threshold, int(np.count_nonzero(counts > threshold))))
+    return spectra
+
+
+def choose_k(reads: Sequence[str], ks: Sequence[int] = CANDIDATE_KS, sample_bases: int = SAMPLE_BASES) -> KmerSpectrum:
+    """ Spectrum of k giving most distinct solid k-mers. k is chosen from
+        spectra of a sample of reads, only spectrum of chosen k is
+        counted from all reads. """
+    reads = ReadStore.from_reads(reads)
+    sample = sample_reads(reads, sample_bases)
+    longest_k = int(np.median(reads.lengths)) if len(reads) else MAX_K
+    spectra = kmer_spectra(sample, [k for k in ks if k <= longest_k] or [min(ks)])
+    best = max(spectra, key=lambda spectrum: spectrum.solid_kmers)
+    return best if sample is reads else kmer_spectra(reads, [best.k])[0]
+
+
+class KmerHistogram(Mapping):
+    """ k-mer counts kept as sorted packed k-mers with their counts, single
+        packed k-mers are binary searched, arrays of them are looked up at
+        once. Also a Mapping of k-mer strings, in canonical mode a k-mer
+        and its reverse complement share one count. """
+
+    def __init__(self, reads: Sequence[str], k: int, canonical=False, chunk_bases=CHUNK_BASES):
+        self.k = k
+        self.canonical = canonical
+        reads = ReadStore.from_reads(reads)
+        keys = np.zeros(0, dtype=np.uint64)
+        counts = np.zeros(0, dtype=np.int64)
+        for start, stop in self._chunks(reads, chunk_bases):
+            chunk_keys, chunk_counts = np.unique(pack_kmers(reads, k, start, stop, canonical), return_counts=True)
+            keys, inverse = np.unique(np.concatenate((keys, chunk_keys)), return_inverse=True)
+            counts = np.bincount(inverse.ravel(), np.concatenate((counts, chunk_counts))).astype(np.int64)
+        self._set_counts(keys, counts)
+
+    @classmethod
+    def from_counts(cls, kmers: np.ndarray, counts: np.ndarray, k: int, canonical=False) -> 'KmerHistogram':
+        """ Histogram of already counted sorted packed k-mers """
+        histogram = cls.__new__(cls)
+        histogram.k = k
+        histogram.canonical = canonical
+        histogram._set_counts(kmers, counts)
+        return histogram
+
+    def _set_counts(self, kmers: np.ndarray, counts: np.ndarray):
+        self.kmers = kmers
+        self.counts = counts
+        # memoryviews index to Python ints, much faster than arrays in bisect
+        self._views = memoryview(kmers), memoryview(counts)
+
+    def __getstate__(self) -> dict:
+        return {name: value for name, value in self.__dict__.items() if name != '_views'}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._set_counts(self.kmers, self.counts)
+
+    @staticmethod
+    def _chunks(reads: ReadStore, chunk_bases: int):
+        """ Split reads into ranges spanning about chunk_bases bases """
+        start = 0
+        while start < len(reads):
+            stop = int(np.searchsorted(reads.offsets, reads.offsets[start] + chunk_bases, side='right')) - 1
+            stop = min(max(stop, start + 1), len(reads))
+            yield start, stop
+            start = stop
+
+    def count(self, packed: int) -> int:
+        if self.canonical:
+            packed = min(packed, reverse_complement(packed, self.k))
+        kmers, counts = self._views
+        position = bisect_left(kmers, packed)
+        return counts[position] if position < len(kmers) and kmers[position] == packed else 0
+
+    def lookup(self, packed: np.ndarray) -> np.ndarray:
+        """ Counts of array of packed (and canonical, if so counted) k-mers """
+        positions = np.minimum(np.searchsorted(self.kmers, packed), max(len(self.kmers) - 1, 0))
+        if not len(self.kmers):
+            return np.zeros(len(packed), dtype=np.int64)
+        return np.where(self.kmers[positions] == packed, self.counts[positions], 0)
+
+    def __getitem__(self, kmer: str) -> int:
+        packed = encode(kmer) if len(kmer) == self.k else None
+        count = self.count(packed) if packed is not None else 0
+        if not count:
+            raise KeyError(kmer)
+        return count
+
+    def __iter__(self) -> Iterator[str]:
+        return (decode(packed, self.k) for packed in self.kmers.tolist())
+
+    def __len__(self):
+        return len(self.kmers)
+
+    def values(self):
+        return self.counts.tolist()
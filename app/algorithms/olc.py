@@ -1,21 +1,41 @@
+import heapq
 import logging
-import math
-import pickle
 import random
 import re
-from functools import lru_cache
+from collections import Counter, namedtuple
+from contextlib import closing
 from itertools import count
-from typing import Sequence
+from time import time
+from typing import Sequence, Tuple, Iterable
 
+import numpy as np
 from cached_property import cached_property
 
-from utils import timing, print_progress
+from algorithms.seeds import SeedIndex
+from algorithms.suffix_array import GeneralizedSuffixArray
+from cache import cache_key, reads_digest
+from parallel import parallel_map, shards, shared
+from profiling import counter, stage
+from read_store import ENCODING
+from progress import track
+from utils import timing
 
 
 class Graph:
     def __init__(self):
         self.nodes = {}
 
+    @classmethod
+    def from_edges(cls, reads: Sequence[str], edges: Sequence[Tuple[int, int, int]]) -> 'Graph':
+        """ Graph of reads with (read a number, read b number, overlap) edges """
+        graph = cls()
+        nodes = [Node(read) for read in reads]
+        for node in nodes:
+            graph.add_node(node)
+        for read_a_number, read_b_number, overlap in edges:
+            nodes[read_a_number].add_edge_with_weight(nodes[read_b_number], overlap)
+        return graph
+
     def add_node(self, node):
         self.nodes[node.id] = node
 
@@ -52,24 +72,103 @@ class Graph:
         return min(self.nodes.values(), key=lambda node: len(node.entries))
 
     def remove_edges_can_be_inferred_1(self):
-        total_iterations = len(self)
-        for iteration_number, node in enumerate(self.nodes.values()):
-            print_progress(iteration_number, total_iterations, 'Removing edges that can be inferred:')
-            for maybe_inferrable_node_id in reversed(node.out_nodes_sorted_by_value):
-                for following_node_id in node.out_nodes_sorted_by_value:
-                    if following_node_id == maybe_inferrable_node_id:
-                        continue
-                    following_node = self[following_node_id]
-                    if following_node_id in node.out and maybe_inferrable_node_id in following_node.out:
-                        node.out.pop(maybe_inferrable_node_id)
-                        self[maybe_inferrable_node_id].entries.pop(node.id)
+        with track(len(self), 'Removing edges that can be inferred') as progress:
+            for iteration_number, node in enumerate(self):
+                progress.update(iteration_number)
+                for maybe_inferrable_node_id in reversed(node.out_nodes_sorted_by_value):
+                    for following_node_id in node.out_nodes_sorted_by_value:
+                        if following_node_id == maybe_inferrable_node_id:
+                            continue
+                        following_node = self[following_node_id]
+                        if following_node_id in node.out and maybe_inferrable_node_id in following_node.out:
+                            node.out.pop(maybe_inferrable_node_id)
+                            self[maybe_inferrable_node_id].entries.pop(node.id)
+                            break
+
+    def reduce_transitive_edges(self, fuzz=10) -> 'TransitiveReduction':
+        """ Myers' transitive reduction of string graph. Edge v -> x is
+            reducible if x is reached by v -> w -> x not adding more than
+            the longest edge of v plus `fuzz` characters. Edges of every
+            node are sorted by length once, reducible edges are marked in
+            one pass in O(E * d) and removed at the end. Reads starting at
+            the same position reach each other by empty edges, only the
+            one with smaller id reduces edges through the other. """
+        start = time()
+        lengths = {node.id: len(node.value) for node in self}
+        out_by_length = {
+            node.id: sorted((lengths[out_id] - overlap, out_id) for out_id, overlap in node.out.items())
+            for node in self
+        }
+        reducible = []
+        for node_id, out_edges in out_by_length.items():
+            if not out_edges:
+                continue
+            in_play = {out_id for _, out_id in out_edges}
+            longest = out_edges[-1][0] + fuzz
+            eliminated = set()
+            for length, following_id in out_edges:
+                if following_id in eliminated or length <= 0 and following_id < node_id:
+                    continue
+                for following_length, inferred_id in out_by_length[following_id]:
+                    if length + following_length > longest:
                         break
+                    if inferred_id in in_play:
+                        eliminated.add(inferred_id)
+            reducible.extend((node_id, inferred_id) for inferred_id in eliminated)
+        self.remove_edges(reducible)
+        reduction = TransitiveReduction(removed_edges=len(reducible), seconds=time() - start)
+        logging.info(f"Removed {reduction.removed_edges} transitive edges in {reduction.seconds:.2f}s")
+        return reduction
+
+    def remove_edges(self, edges: Iterable[Tuple[int, int]]):
+        for node_id, out_id in edges:
+            self[node_id].out.pop(out_id)
+            self[out_id].entries.pop(node_id)
 
     @property
     def average_node_value_length(self):
         return sum([len(node.value) for node in self]) / len(self)
 
 
+TransitiveReduction = namedtuple('TransitiveReduction', ['removed_edges', 'seconds'])
+
+
+class NodeQueue:
+    """ Nodes of graph in a heap ordered by key(node), ties broken by order
+        of graph iteration. Invalidation is lazy: `update` pushes a new
+        entry and outdated or removed ones are skipped by `pop`, so both
+        are O(log n). """
+
+    def __init__(self, graph: Graph, key):
+        self.graph = graph
+        self.key = key
+        self.order = {}
+        self.heap = []
+        for order, node in enumerate(graph):
+            self.order[node.id] = order
+            self.heap.append((key(node), order, node.id))
+        heapq.heapify(self.heap)
+
+    def update(self, node_ids: Iterable[int]):
+        """ Re-queue nodes whose key has changed """
+        for node_id in node_ids:
+            try:
+                node = self.graph[node_id]
+            except KeyError:
+                continue
+            heapq.heappush(self.heap, (self.key(node), self.order[node_id], node_id))
+
+    def pop(self) -> 'Node':
+        while True:
+            key, _, node_id = heapq.heappop(self.heap)
+            try:
+                node = self.graph[node_id]
+            except KeyError:
+                continue
+            if key == self.key(node):
+                return node
+
+
 class Node:
     _id = count()
 
@@ -101,170 +200,566 @@ class Node:
         return hash(self.value)
 
 
-def olc_naive(data: Sequence[str]):
-    overlap_graph = overlap_naive(data)
-    sequence = naive_graph_path(overlap_graph)
-    return max(sequence, key=lambda x: len(max(x, key=len)))
+def olc_naive(data: Sequence[str], workers=1, graph_type=None, cache=None):
+    overlap_graph = overlap_naive(data, workers, graph_type, cache)
+    with stage('naive_paths'):
+        sequence = naive_graph_path(overlap_graph, workers)
+        return max(sequence, key=lambda x: len(max(x, key=len)))
+
+
+def olc(data: Sequence[str], workers=1, graph_type=None, cache=None, pairs=()):
+    overlap_graph = overlap_naive(data, workers, graph_type, cache)
+    contigs = layout_contigs(overlap_graph, pairs)
+    return consensus(contigs)
 
 
-def olc(data: Sequence[str]):
-    overlap_graph = overlap_naive(data)
-    sequences = layout(overlap_graph)
-    return sequences
+def olc_suffix(data: Sequence[str], graph_type=None, cache=None, pairs=()):
+    overlap_graph = overlap_suffix(data, graph_type, cache)
+    return consensus(layout_contigs(overlap_graph, pairs))
 
 
-def olc_suffix(data: Sequence[str]):
-    overlap_graph = overlap_suffix(data)
-    contigs = layout(overlap_graph)
-    sequence = consensus(contigs)
-    return sequence
+def olc_dynamic(data: Sequence[str], workers=1, graph_type=None, cache=None, pairs=()):
+    overlap_graph = overlap_dynamic(data, workers=workers, graph_type=graph_type, cache=cache)
+    return consensus(layout_contigs(overlap_graph, pairs))
 
 
-def olc_dynamic(data: Sequence[str]):
-    overlap_graph = overlap_dynamic(data)
-    return layout(overlap_graph)
+def _collect_edges(reads: [str], shards, results) -> [Tuple[int, int, int]]:
+    """ (read a, read b, overlap) edges computed for consecutive shards of
+        reads, in the same order a single loop over reads would add them """
+    edges = []
+    with closing(results), track(len(reads), 'Building graph') as progress:
+        for (_, stop), shard_edges in zip(shards, results):
+            progress.update(stop)
+            edges.extend(shard_edges)
+    return edges
 
 
-def overlap_naive(data: Sequence[str]):
+def _graph(reads: [str], key_parts: tuple, compute_edges, graph_type=None, cache=None) -> Graph:
+    """ Graph of reads with edges computed by compute_edges, which are
+        stored in cache by digest of reads and key parts (name and parameters
+        of stage) """
+    with stage('overlap'):
+        if cache is None:
+            edges = compute_edges()
+        else:
+            def compute():
+                return {'edges': np.array(compute_edges(), dtype=np.int32).reshape(-1, 3)}
+            edges = cache.fetch(cache_key(*key_parts, reads_digest(reads)), compute)['edges'].tolist()
+        graph = (graph_type or Graph).from_edges(reads, edges)
+        counter('graph_nodes', len(graph))
+        counter('graph_edges', len(edges))
+    return graph
+
+
+def overlap_naive(data: Sequence[str], workers=1, graph_type=None, cache=None):
     minimum_overlap_size = 6
-    graph = Graph()
-    for read in data:
-        graph.add_node(Node(read))
-    total_iterations = len(graph)
-    for iteration_number, read_a in enumerate(graph):
-        print_progress(iteration_number, total_iterations, 'Building graph:')
-        sufix = read_a.value[-minimum_overlap_size:]
+    reads = list(data)
+
+    def compute_edges():
+        seeds = SeedIndex(reads, minimum_overlap_size)
+        read_shards = shards(len(reads), workers)
+        results = parallel_map(_overlaps_naive, read_shards, workers,
+                               reads=reads, seeds=seeds, minimum_overlap_size=minimum_overlap_size)
+        return _collect_edges(reads, read_shards, results)
+    return _graph(reads, ('overlap_naive', minimum_overlap_size), compute_edges, graph_type, cache)
+
+
+def _overlaps_naive(shard: (int, int)) -> [(int, int, int)]:
+    reads, seeds, minimum_overlap_size = shared('reads'), shared('seeds'), shared('minimum_overlap_size')
+    edges = []
+    for read_a_number in range(*shard):
+        read_a = reads[read_a_number]
+        sufix = read_a[-minimum_overlap_size:]
         sufix_pattern = re.compile(f'.*{sufix}')
-        for read_b in graph:
+        # only reads containing the suffix can have a matching prefix
+        for read_b_number in seeds.reads_containing(sufix):
+            read_b = reads[read_b_number]
             if read_a == read_b:
                 continue
-            for prefix in re.findall(sufix_pattern, read_b.value):
-                if read_a.value.endswith(prefix):
-                    read_a.add_edge_with_weight(read_b, len(prefix))
+            for prefix in re.findall(sufix_pattern, read_b):
+                if read_a.endswith(prefix):
+                    edges.append((read_a_number, read_b_number, len(prefix)))
                     break
-    return graph
+    return edges
+
 
+def naive_graph_path(graph: Graph, workers=1) -> Iterable[Sequence[str]]:
+    """ Super strings of a walk from every node of graph, in order of graph
+        iteration, skipping walks without any long enough super string """
+    walks = NaiveWalks(graph)
+    walk_shards = shards(len(walks.values), workers)
+    results = parallel_map(_naive_walks, walk_shards, workers, walks=walks)
+    with closing(results), track(len(walks.values), 'Walking from every node') as progress:
+        for (_, stop), super_strings in zip(walk_shards, results):
+            progress.update(stop)
+            yield from super_strings
 
-def naive_graph_path(graph):
-    pickled_graph = pickle.dumps(graph)
-    for node in graph:
-        super_strings = naive_graph_path_staring_from_node(pickle.loads(pickled_graph), node)
-        if super_strings:
-            yield super_strings
+
+def _naive_walks(shard: (int, int)) -> [[str]]:
+    walks = shared('walks')
+    return [super_strings for super_strings in map(walks.super_strings, range(*shard)) if super_strings]
 
 
 def naive_graph_path_staring_from_node(graph: Graph, start_node_id: int) -> [str]:
-    node = graph[start_node_id]
-    read_length = len(node.value)
-    minimal_super_string_length = len(graph) * read_length * 0.01
-    super_strings = []
-
-    graph.remove_node(node)
-    super_strings.append(node.value)
-    while len(graph):
-        while node.has_out:
-            node_id, overlap = node.get_next_node_id_and_overlap()
-            node = graph[node_id]
-            graph.remove_node(node)
-            super_strings[-1] += node.value[overlap:]
-        if len(graph):
-            node = graph.get_node_greatest_number_of_out()
-            super_strings.append(node.value)
-            graph.remove_node(node)
-    super_strings = [super_string for super_string in super_strings if len(super_string) > minimal_super_string_length]
-    logging.info(f"Generated {len(super_strings)} contigs!")
-    return super_strings
-
-
-def overlap_suffix(data: Sequence[str]):
-    raise NotImplementedError
-
-
-def overlap_dynamic(data: Sequence[str]):
+    walks = NaiveWalks(graph)
+    return walks.super_strings(walks.index[graph[start_node_id].id])
+
+
+class NaiveWalks:
+    """ Adjacency of graph frozen in lists indexed by position of node in
+        graph iteration. Walks are run against it with their own alive
+        flags and out degrees, so the graph is neither copied nor changed
+        and every walk costs O(n + E). """
+
+    def __init__(self, graph: Graph):
+        nodes = list(graph)
+        self.index = {node.id: index for index, node in enumerate(nodes)}
+        self.values = [node.value for node in nodes]
+        self.out = [[(self.index[out_id], overlap) for out_id, overlap in node.out.items()] for node in nodes]
+        self.entries = [[self.index[entry_id] for entry_id in node.entries.keys()] for node in nodes]
+
+    def super_strings(self, start: int) -> [str]:
+        """ Same walk as laying out a copy of graph from start node and then
+            from nodes having most out edges left """
+        n = len(self.values)
+        minimal_super_string_length = n * len(self.values[start]) * 0.01
+        alive = bytearray(b'\x01') * n
+        out_degree = [len(out) for out in self.out]
+        starts = [(-degree, index) for index, degree in enumerate(out_degree)]
+        heapq.heapify(starts)
+
+        def remove(node: int):
+            alive[node] = False
+            for entry in self.entries[node]:
+                if alive[entry]:
+                    out_degree[entry] -= 1
+                    heapq.heappush(starts, (-out_degree[entry], entry))
+
+        remove(start)
+        super_strings = [self._extend(start, alive, remove)]
+        while starts:
+            key, node = heapq.heappop(starts)
+            if alive[node] and key == -out_degree[node]:
+                remove(node)
+                super_strings.append(self._extend(node, alive, remove))
+        super_strings = [super_string for super_string in super_strings
+                         if len(super_string) > minimal_super_string_length]
+        logging.info(f"Generated {len(super_strings)} contigs!")
+        return super_strings
+
+    def _extend(self, node: int, alive: bytearray, remove) -> str:
+        """ Like `_extend_contig`, first of the greatest overlaps wins """
+        reads, offsets = [self.values[node]], [0]
+        while True:
+            following, greatest = None, None
+            for out, overlap in self.out[node]:
+                if alive[out] and (greatest is None or overlap > greatest):
+                    following, greatest = out, overlap
+            if following is None:
+                return Contig(reads, offsets).sequence
+            node = following
+            remove(node)
+            offsets.append(offsets[-1] + len(reads[-1]) - greatest)
+            reads.append(self.values[node])
+
+
+def overlap_suffix(data: Sequence[str], graph_type=None, cache=None):
     logging.info("Building graph.")
     minimum_overlap_size = 6
-    graph = Graph()
-    for read in data:
-        graph.add_node(Node(read))
-    total_iterations = len(graph)
-    for iteration, node_x in enumerate(graph):
-        print_progress(iteration, total_iterations, prefix='Building graph:')
-        for node_y in graph:
-            if node_x == node_y:
-                continue
-            overlap = _check_overlap_dynamic(node_x, node_y, minimum_overlap_size)
-            if overlap:
-                node_x.add_edge_with_weight(node_y, overlap)
+    reads = list(data)
+
+    def compute_edges():
+        suffix_array = GeneralizedSuffixArray(reads)
+        overlaps = suffix_array.suffix_prefix_overlaps(minimum_overlap_size)
+        return [(read_a_number, read_b_number, overlap)
+                for (read_a_number, read_b_number), overlap in sorted(overlaps.items())
+                if reads[read_a_number] != reads[read_b_number]]
+    graph = _graph(reads, ('overlap_suffix', minimum_overlap_size), compute_edges, graph_type, cache)
+    logging.info("Graph has been built!")
+    return graph
+
+
+def overlap_dynamic(data: Sequence[str], seed_length=None, seed_window=1, workers=1, graph_type=None, cache=None):
+    """ Graph of overlaps scored by dynamic programming, allowing
+        substitutions and indels. The seed index only prunes pairs of reads
+        that cannot overlap: by default seeds are all k-mers as long as the
+        minimum overlap, so every overlap with an exact stretch of that
+        length is scored. Longer seeds or minimizers (seed_window > 1) are
+        faster, but can only be used if seed_length + seed_window - 1 is
+        not above the minimum overlap. """
+    logging.info("Building graph.")
+    minimum_overlap_size = 6
+    seed_length = seed_length or minimum_overlap_size
+    assert seed_length + seed_window - 1 <= minimum_overlap_size, "seeds would miss short overlaps"
+    reads = list(data)
+
+    def compute_edges():
+        seeds = SeedIndex(reads, seed_length, window=seed_window)
+        logging.info(f"Seed index has {len(seeds)} seeds.")
+        read_shards = shards(len(reads), workers)
+        results = parallel_map(_overlaps_dynamic, read_shards, workers,
+                               reads=reads, seeds=seeds, minimum_overlap_size=minimum_overlap_size)
+        return _collect_edges(reads, read_shards, results)
+    key_parts = ('overlap_dynamic', minimum_overlap_size, seed_length, seed_window)
+    graph = _graph(reads, key_parts, compute_edges, graph_type, cache)
     logging.info("Graph has been built!")
     return graph
 
 
+def _overlaps_dynamic(shard: (int, int)) -> [(int, int, int)]:
+    reads, seeds, minimum_overlap_size = shared('reads'), shared('seeds'), shared('minimum_overlap_size')
+    edges = []
+    for read_x_number in range(*shard):
+        read_x = reads[read_x_number]
+        candidates = [read_y_number for read_y_number in seeds.overlap_candidates(read_x, minimum_overlap_size)
+                      if reads[read_y_number] != read_x]
+        overlaps = _check_overlaps_dynamic(read_x, [reads[read_y_number] for read_y_number in candidates],
+                                           minimum_overlap_size)
+        for read_y_number, overlap in zip(candidates, overlaps):
+            if overlap:
+                edges.append((read_x_number, read_y_number, overlap))
+    return edges
+
+
+COST_FULL = 4
+COST_SAME_GROUP = COST_FULL // 2
+COST_GAP = COST_FULL * 2
+ALLOWED_MISMATCHES_PERCENT = 0.1
+# costs are small integers, cells out of reach start at this cost instead of infinity
+UNREACHABLE = 1 << 24
+
+
+def _substitution_matrix() -> np.ndarray:
+    """ Substitution costs for every pair of bytes, byte 0 is padding """
+    costs = np.full((256, 256), COST_FULL, dtype=np.int32)
+    for a, b in ('AG', 'TC'):
+        costs[ord(a), ord(b)] = costs[ord(b), ord(a)] = COST_SAME_GROUP
+    np.fill_diagonal(costs, 0)
+    costs[:, 0] = UNREACHABLE
+    return costs
+
+
+SUBSTITUTION_COSTS = _substitution_matrix()
+
+
 def _check_overlap_dynamic(node_x, node_y, minimal_overlap: int) -> int or None:
-    x = len(node_x.value)
-    y = len(node_y.value)
-    assert x == y
-    cost_full = 4
-    cost_same_group = cost_full / 2
-    cost_gap = cost_full * 2
-    allowed_mismatches_percent = 0.1
-
-    @lru_cache(maxsize=None)
-    def s(a: str, b: str) -> int:
-        if a == b:
-            return 0
-        else:
-            ab = {a, b}
-            if {'A', 'G'} == ab or {'T', 'C'} == ab:
-                return cost_same_group
-            else:
-                return cost_full
-
-    table = []
-    for row in range(x + 1):
-        table.append([])
-        for col in range(y + 1):
-            if col == 0:
-                val = 0
-            elif row == 0:
-                val = math.inf
-            else:
-                val = None
-            table[-1].append(val)
-    for i, char_x in zip(range(1, x + 1), node_x.value):
-        for j, char_y in zip(range(1, y + 1), node_y.value):
-            table[i][j] = min(
-                table[i - 1][j] + cost_gap,
-                table[i][j - 1] + cost_gap,
-                table[i - 1][j - 1] + s(char_x, char_y),
-            )
-    score = min(table[-1][minimal_overlap:])
-    overlap = table[-1][minimal_overlap:].index(score) + minimal_overlap
-    if overlap * allowed_mismatches_percent * cost_full >= score:
+    return _check_overlaps_dynamic(node_x.value, [node_y.value], minimal_overlap)[0]
+
+
+def _check_overlaps_dynamic(read_x: str, reads_y: Sequence[str], minimal_overlap: int) -> [int or None]:
+    """ Score suffix of read_x against prefixes of all reads_y at once.
+        Rows of the DP table are NumPy arrays over all candidates, horizontal
+        gaps are resolved with a running minimum. Cells more than `band`
+        columns right of the main diagonal need more gaps than an accepted
+        overlap can afford, so they are never computed. """
+    if not reads_y:
+        return []
+    x = len(read_x)
+    y = max(len(read_y) for read_y in reads_y)
+    band = int(y * ALLOWED_MISMATCHES_PERCENT * COST_FULL / COST_GAP)
+    codes_x = np.frombuffer(read_x.encode(), dtype=np.uint8)
+    codes_y = np.zeros((len(reads_y), y), dtype=np.uint8)
+    for number, read_y in enumerate(reads_y):
+        codes_y[number, :len(read_y)] = np.frombuffer(read_y.encode(), dtype=np.uint8)
+    # costs of every base of read_x against all of reads_y, gathered once per distinct base
+    substitutions = {code: SUBSTITUTION_COSTS[code][codes_y] for code in set(codes_x.tolist())}
+    gaps = COST_GAP * np.arange(y + 1, dtype=np.int32)
+    row = np.full((len(reads_y), y + 1), UNREACHABLE, dtype=np.int32)
+    row[:, 0] = 0
+    for i in range(1, x + 1):
+        width = min(y, i + band) + 1
+        new_row = np.full_like(row, UNREACHABLE)
+        new_row[:, 1:width] = np.minimum(
+            row[:, 1:width] + COST_GAP,
+            row[:, :width - 1] + substitutions[codes_x[i - 1]][:, :width - 1],
+        )
+        new_row[:, 0] = 0
+        new_row[:, :width] = np.minimum.accumulate(new_row[:, :width] - gaps[:width], axis=1) + gaps[:width]
+        row = new_row
+    return [_pick_overlap(row[number, minimal_overlap:len(read_y) + 1], minimal_overlap, band)
+            for number, read_y in enumerate(reads_y)]
+
+
+def _pick_overlap(scores: np.ndarray, minimal_overlap: int, band: int) -> int or None:
+    if not len(scores):
+        return None
+    score = scores.min()
+    # outside the band only alignments with more than `band` gaps are
+    # lost, such score is too high to be accepted as an overlap anyway
+    if score >= COST_GAP * (band + 1):
+        return None
+    overlap = int(scores.argmin()) + minimal_overlap
+    if overlap * ALLOWED_MISMATCHES_PERCENT * COST_FULL >= score:
         return overlap
 
 
-def layout(overlap_graph: Graph):
+def layout(overlap_graph: Graph, pairs: Sequence[np.ndarray] = ()) -> [str]:
+    return [contig.sequence for contig in layout_contigs(overlap_graph, pairs)]
+
+
+def layout_contigs(overlap_graph: Graph, pairs: Sequence[np.ndarray] = ()) -> ['Contig']:
+    """ Contigs of graph of reads, joined into scaffolds by (first mate,
+        second mate) read numbers of paired libraries if there are any """
+    with stage('layout'):
+        contigs = _layout_contigs(overlap_graph)
+    if any(len(library) for library in pairs):
+        with stage('scaffold'):
+            contigs = scaffold(contigs, pairs)
+    return contigs
+
+
+def _layout_contigs(overlap_graph: Graph) -> ['Contig']:
     minimal_super_string_length = len(overlap_graph) * overlap_graph.average_node_value_length * 0.01
-    overlap_graph.remove_edges_can_be_inferred_1()
-    node = overlap_graph.get_node_with_smallest_number_of_entries()
-    overlap_graph.remove_node(node)
-    super_strings = [node.value]
+    counter('transitive_edges_removed', overlap_graph.reduce_transitive_edges().removed_edges)
+    starts = NodeQueue(overlap_graph, key=lambda node: len(node.entries))
+
+    def remove(node):
+        overlap_graph.remove_node(node)
+        starts.update(node.out)
+
+    contigs = []
     while overlap_graph:
-        while node.has_out:
-            node_id, overlap = node.get_next_node_id_and_overlap()
-            node = overlap_graph[node_id]
-            overlap_graph.remove_node(node)
-            super_strings[-1] += node.value[overlap:]
-        if overlap_graph:
-            node = overlap_graph.get_node_with_smallest_number_of_entries()
-            overlap_graph.remove_node(node)
-            super_strings.append(node.value)
-    super_strings = [super_string for super_string in super_strings if len(super_string) > minimal_super_string_length]
-    return super_strings
-
-
-def consensus(contigs):
-    raise NotImplementedError
+        node = starts.pop()
+        remove(node)
+        contigs.append(_extend_contig(overlap_graph, node, remove, starts.order))
+    contigs = [contig for contig in contigs if contig.length > minimal_super_string_length]
+    return contigs
+
+
+def _extend_contig(graph: Graph, node: 'Node', remove, numbers: dict) -> 'Contig':
+    """ Follow the greatest overlaps from already removed node while it is
+        possible, removing every visited node. Numbers of reads are their
+        positions in graph iteration. """
+    reads, offsets, read_numbers = [node.value], [0], [numbers[node.id]]
+    while node.has_out:
+        node_id, overlap = node.get_next_node_id_and_overlap()
+        node = graph[node_id]
+        remove(node)
+        offsets.append(offsets[-1] + len(reads[-1]) - overlap)
+        reads.append(node.value)
+        read_numbers.append(numbers[node_id])
+    return Contig(reads, offsets, read_numbers)
+
+
+class Contig(namedtuple('Contig', ['reads', 'offsets', 'numbers'])):
+    """ Reads of contig in layout order with positions of their starts and
+        their numbers among assembled reads, if known """
+    __slots__ = ()
+
+    @property
+    def length(self) -> int:
+        """ End of the read reaching furthest, not necessarily the last one """
+        return max(offset + len(read) for read, offset in zip(self.reads, self.offsets))
+
+    @property
+    def sequence(self) -> str:
+        """ Every read continues contig from the furthest end of reads
+            before it, gaps between reads of a scaffold are filled with N """
+        parts = [self.reads[0]]
+        end = len(self.reads[0])
+        for read, offset in zip(self.reads[1:], self.offsets[1:]):
+            if offset > end:
+                parts.append('N' * (offset - end))
+            if offset + len(read) > end:
+                parts.append(read[max(end - offset, 0):])
+                end = offset + len(read)
+        return ''.join(parts)
+
+
+Contig.__new__.__defaults__ = (None,)
+
+# pairs linking two contigs needed to join them
+MIN_LINKS = 2
+# pairs within contigs needed to estimate insert size of library
+MIN_INSERT_SAMPLES = 10
+
+
+def scaffold(contigs: Sequence[Contig], pairs: Sequence[np.ndarray]) -> [Contig]:
+    """ Contigs joined in order and at distance given by mates placed in
+        different contigs, which is how far apart they are within
+        contigs, as median insert size of their library. Links of at least
+        MIN_LINKS pairs are taken greedily from the best supported ones,
+        so that every contig has at most one successor and predecessor
+        and no cycle is formed. Gap of every join is the median of its
+        pairs. """
+    placement = _Placement(contigs, max((int(library.max()) for library in pairs if len(library)), default=-1) + 1)
+    gaps = {}
+    for library in pairs:
+        for link, gap in _links(placement, library):
+            gaps.setdefault(link, []).append(gap)
+    links = sorted(
+        ((len(link_gaps), link, int(np.median(link_gaps))) for link, link_gaps in gaps.items()
+         if len(link_gaps) >= MIN_LINKS),
+        key=lambda link: (-link[0], link[1]),
+    )
+    chains = list(range(len(contigs)))
+
+    def chain_of(contig: int) -> int:
+        while chains[contig] != contig:
+            chains[contig] = contig = chains[chains[contig]]
+        return contig
+
+    successors, predecessors = {}, {}
+    for _, (first, second), gap in links:
+        if first in successors or second in predecessors or chain_of(first) == chain_of(second):
+            continue
+        successors[first] = second, gap
+        predecessors[second] = first
+        chains[chain_of(second)] = chain_of(first)
+    counter('scaffold_links', len(successors))
+
+    scaffolds = [_join(contigs, successors, first) for first in range(len(contigs)) if first not in predecessors]
+    counter('scaffolds', len(scaffolds))
+    return scaffolds
+
+
+def _join(contigs: Sequence[Contig], successors: dict, first: int) -> Contig:
+    """ Contig of reads of chain of contigs starting from first one """
+    reads, offsets, numbers = [], [], []
+    contig, start = first, 0
+    while True:
+        reads.extend(contigs[contig].reads)
+        offsets.extend(start + offset for offset in contigs[contig].offsets)
+        numbers.extend(contigs[contig].numbers)
+        if contig not in successors:
+            return Contig(reads, offsets, numbers)
+        end = start + contigs[contig].length
+        contig, gap = successors[contig]
+        # contigs may overlap, but no more than by first read of the next one
+        start = end + max(gap, 1 - len(contigs[contig].reads[0]))
+
+
+class _Placement:
+    """ Contig, start and end within it of every read placed in contigs,
+        contig is -1 for other reads """
+
+    def __init__(self, contigs: Sequence[Contig], number_of_reads: int):
+        self.contig = np.full(number_of_reads, -1, dtype=np.int64)
+        self.start = np.zeros(number_of_reads, dtype=np.int64)
+        self.end = np.zeros(number_of_reads, dtype=np.int64)
+        for contig_number, contig in enumerate(contigs):
+            numbers = np.array(contig.numbers, dtype=np.int64)
+            known = numbers < number_of_reads
+            self.contig[numbers[known]] = contig_number
+            self.start[numbers[known]] = np.array(contig.offsets)[known]
+            self.end[numbers[known]] = np.array(contig.offsets)[known] + np.array(list(map(len, contig.reads)))[known]
+        self.lengths = np.array([contig.length for contig in contigs], dtype=np.int64)
+
+
+def _links(placement: _Placement, library: np.ndarray) -> Iterable[Tuple[Tuple[int, int], int]]:
+    """ ((contig of first mate, contig of second mate), gap) of pairs of
+        library placed in different contigs. First mate is upstream of the
+        second one, at distance of median insert size of pairs within
+        contigs, so both of them have to be closer than that to the end
+        and the start of their contigs. """
+    first, second = library[:, 0], library[:, 1]
+    first_contig, second_contig = placement.contig[first], placement.contig[second]
+    inserts = placement.end[second] - placement.start[first]
+    within = (first_contig >= 0) & (first_contig == second_contig) & (inserts > 0)
+    if np.count_nonzero(within) < MIN_INSERT_SAMPLES:
+        return []
+    insert_size = int(np.median(inserts[within]))
+    to_end = placement.lengths[first_contig] - placement.start[first]
+    between = (first_contig >= 0) & (second_contig >= 0) & (first_contig != second_contig) & \
+        (to_end <= insert_size) & (placement.end[second] <= insert_size)
+    gaps = insert_size - to_end - placement.end[second]
+    links = zip(first_contig[between].tolist(), second_contig[between].tolist())
+    return zip(links, gaps[between].tolist())
+
+
+BASES = b'ACGT'
+# symbol voted by reads with no base in a column of layout sequence
+GAP = 4
+SYMBOLS = np.frombuffer(BASES + b'-', dtype=np.uint8)
+# reads are aligned to layout sequence this far around their offset, as a fraction of their length
+PLACEMENT_SLACK = 0.1
+
+
+def consensus(contigs: Sequence[Contig]) -> [str]:
+    """ Majority vote of reads in every column of layout sequence of
+        contig. Every read is first aligned to the layout sequence around
+        its offset, so reads joined by overlaps with indels still vote on
+        the right columns: for their bases, for a gap where they lack a
+        base of the layout and for bases they have between two of its
+        columns. Ties and columns without any ACGT base or gap vote keep
+        base of layout sequence. """
+    with stage('consensus'):
+        return [_consensus(contig) for contig in contigs]
+
+
+def _consensus(contig: Contig) -> str:
+    sequence = np.frombuffer(contig.sequence.encode(), dtype=np.uint8)
+    layout_codes = ENCODING[sequence]
+    # twice the votes, plus one for base of layout sequence to break ties
+    votes = np.zeros((len(sequence), 5), dtype=np.int32)
+    depth = np.zeros(len(sequence), dtype=np.int32)
+    insertions = {}
+    for read, offset in zip(contig.reads, contig.offsets):
+        codes = ENCODING[np.frombuffer(read.encode(), dtype=np.uint8)]
+        slack = int(len(codes) * PLACEMENT_SLACK) + 1
+        start = max(offset - slack, 0)
+        columns, first, end = _place(codes, layout_codes[start:offset + len(codes) + slack], offset - start)
+        depth[start + first:start + end] += 1
+        votes[start + first:start + end, GAP] += 2
+        placed = np.flatnonzero(columns >= 0)
+        votes[start + columns[placed], GAP] -= 2
+        known = placed[codes[placed] < 4]
+        votes[start + columns[known], codes[known]] += 2
+        for number in np.flatnonzero((columns < 0) & (codes < 4)).tolist():
+            following = int(np.searchsorted(placed, number))
+            column = start + (columns[placed[following]] if following < len(placed) else end)
+            rank = number - (placed[following - 1] if following else -1) - 1
+            key = (int(column), int(rank))
+            insertions.setdefault(key, Counter())[int(codes[number])] += 1
+    known = layout_codes < 4
+    votes[np.flatnonzero(known), layout_codes[known]] += 1
+    symbols = np.where(votes.any(axis=1), SYMBOLS[votes.argmax(axis=1)], sequence)
+    positions, inserted = _accepted_insertions(insertions, depth)
+    symbols = np.insert(symbols, positions, SYMBOLS[inserted].reshape(-1))
+    return symbols[symbols != SYMBOLS[GAP]].tobytes().decode()
+
+
+def _accepted_insertions(insertions: dict, depth: np.ndarray) -> Tuple[[int], [int]]:
+    """ Positions and codes of bases inserted before columns by majority of
+        reads spanning them, n-th base only after the first n - 1 ones """
+    positions, inserted = [], []
+    for column, rank in sorted(insertions):
+        if rank and (not positions or positions[-1] != column or len(inserted) < rank):
+            continue
+        code, count = insertions[column, rank].most_common(1)[0]
+        if 2 * count > depth[min(column, len(depth) - 1)]:
+            positions.append(column)
+            inserted.append(code)
+    return positions, inserted
+
+
+def _place(codes: np.ndarray, window: np.ndarray, expected_start: int) -> Tuple[np.ndarray, int, int]:
+    """ Edit distance alignment of the whole read to a part of window.
+        Returns window column of every base of read (-1 for bases not in
+        window) and the first and after the last column of the aligned part.
+        Among equally good alignments, the one starting closest to the
+        expected start is chosen. """
+    n, m = len(codes), len(window)
+    steps = np.arange(m + 1, dtype=np.int32)
+    table = np.zeros((n + 1, m + 1), dtype=np.int32)
+    for i in range(1, n + 1):
+        row = np.empty(m + 1, dtype=np.int32)
+        row[0] = i
+        row[1:] = np.minimum(table[i - 1, :-1] + (window != codes[i - 1]), table[i - 1, 1:] + 1)
+        table[i] = np.minimum.accumulate(row - steps) + steps
+    ends = np.flatnonzero(table[n] == table[n].min())
+    end = int(ends[np.abs(ends - (expected_start + n)).argmin()])
+    columns = np.full(n, -1, dtype=np.int64)
+    i, j = n, end
+    while i > 0:
+        if j > 0 and table[i, j] == table[i - 1, j - 1] + (window[j - 1] != codes[i - 1]):
+            i, j = i - 1, j - 1
+            columns[i] = j
+        elif table[i, j] == table[i - 1, j] + 1:
+            i -= 1
+        else:
+            j -= 1
+    return columns, j, end
 
 
 if __name__ == '__main__':
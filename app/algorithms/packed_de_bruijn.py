@@ -0,0 +1,133 @@
+from collections.abc import Mapping, Sequence
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from algorithms.de_bruijn import DeBruijnGraph
+from algorithms.kmers import KmerHistogram, MAX_K, decode
+
+BASES = 'ACGT'
+# base of out-edge mask having a single bit set
+BASE_OF_MASK = {1 << code: base for code, base in enumerate(BASES)}
+
+
+class PackedDeBruijnGraph(DeBruijnGraph):
+    """ De Bruijn multigraph kept in NumPy arrays. Nodes are (k-1)-mers
+        packed 2 bits per base in a sorted array, node `i` is
+        `nodes[i]`. Every node has in and out degree (edge multiplicity
+        included) and a 4-bit mask of bases of its out edges. Distinct
+        edges are the sorted packed k-mers with their multiplicities, edges
+        of node `i` are `edge_offsets[i]:edge_offsets[i + 1]`.
+
+        Has the same API as `DeBruijnGraph`, nodes are ints. Only k-mers
+        made of ACGT are used, k is at most 32. """
+
+    def __init__(self, strIter: Iterable[str], k: int):
+        assert 1 < k <= MAX_K
+        self._super_string = None
+        self.k = k
+        histogram = KmerHistogram(strIter, k)
+        self.edges = histogram.kmers
+        self.multiplicities = histogram.counts.astype(np.int32)
+        left = self.edges >> np.uint64(2)
+        right = self.edges & np.uint64((1 << 2 * (k - 1)) - 1)
+        self.nodes = np.union1d(left, right)
+        n = len(self.nodes)
+        sources = np.searchsorted(self.nodes, left)
+        self.targets = np.searchsorted(self.nodes, right).astype(np.int32)
+        self.edge_offsets = np.searchsorted(sources, np.arange(n + 1))
+        self.out_masks = np.zeros(n, dtype=np.uint8)
+        np.bitwise_or.at(self.out_masks, sources, (1 << (self.edges & np.uint64(3))).astype(np.uint8))
+        self.out_degree = np.bincount(sources, self.multiplicities, minlength=n).astype(np.int32)
+        self.in_degree = np.bincount(self.targets, self.multiplicities, minlength=n).astype(np.int32)
+
+        difference = self.out_degree - self.in_degree
+        self.nodes_balanced = int(np.count_nonzero(difference == 0))
+        self.nodes_semi_balanced = int(np.count_nonzero(np.abs(difference) == 1))
+        self.nodes_not_balanced = n - self.nodes_balanced - self.nodes_semi_balanced
+        heads, tails = np.flatnonzero(difference == 1), np.flatnonzero(difference == -1)
+        self.head = int(heads[-1]) if len(heads) else None
+        self.tail = int(tails[-1]) if len(tails) else None
+
+    @property
+    def graph(self) -> 'Successors':
+        return Successors(self)
+
+    @property
+    def number_of_edges(self) -> int:
+        return int(self.multiplicities.sum())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.edges, self.multiplicities, self.nodes, self.targets,
+            self.edge_offsets, self.out_masks, self.out_degree, self.in_degree,
+        ))
+
+    def _label(self, node: int) -> str:
+        return decode(int(self.nodes[node]), self.k - 1)
+
+    def unitigs(self) -> [str]:
+        """ Strings of maximal non-branching paths of graph with repeated
+            edges merged, every distinct k-mer is used by one unitig """
+        distinct_out = np.diff(self.edge_offsets)
+        distinct_in = np.bincount(self.targets, minlength=len(self.nodes))
+        one_in_one_out = (distinct_in == 1) & (distinct_out == 1)
+        visited = np.zeros(len(self.nodes), dtype=np.bool_)
+        unitigs = []
+        for node in np.flatnonzero(~one_in_one_out & (distinct_out > 0)).tolist():
+            for edge in range(self.edge_offsets[node], self.edge_offsets[node + 1]):
+                unitigs.append(self._walk(node, edge, one_in_one_out, visited))
+        # What is left are isolated cycles of non-branching nodes
+        for node in np.flatnonzero(one_in_one_out).tolist():
+            if not visited[node]:
+                visited[node] = True
+                unitigs.append(self._walk(node, self.edge_offsets[node], one_in_one_out, visited))
+        return unitigs
+
+    def _walk(self, node: int, edge: int, one_in_one_out: np.ndarray, visited: np.ndarray) -> str:
+        """ String of path from node through edge and on through
+            non-branching nodes not visited yet """
+        parts = [self._label(node), BASES[int(self.edges[edge]) & 3]]
+        following = self.targets[edge]
+        while one_in_one_out[following] and not visited[following]:
+            visited[following] = True
+            parts.append(BASE_OF_MASK[int(self.out_masks[following])])
+            following = self.targets[self.edge_offsets[following]]
+        return ''.join(parts)
+
+
+class Successors(Mapping):
+    """ Read-only {node: successors} view of `PackedDeBruijnGraph`, only
+        nodes having out edges are keys """
+
+    def __init__(self, graph: PackedDeBruijnGraph):
+        self._graph = graph
+
+    def __getitem__(self, node: int) -> 'Neighbours':
+        if not self._graph.out_degree[node]:
+            raise KeyError(node)
+        return Neighbours(self._graph, node)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(self._graph.out_degree).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self._graph.out_degree))
+
+
+class Neighbours(Sequence):
+    """ Successors of node, each repeated by multiplicity of its edge """
+
+    def __init__(self, graph: PackedDeBruijnGraph, node: int):
+        self._graph = graph
+        self._edges = slice(graph.edge_offsets[node], graph.edge_offsets[node + 1])
+
+    def __getitem__(self, item: int) -> int:
+        ends = np.cumsum(self._graph.multiplicities[self._edges])
+        if not 0 <= item < ends[-1]:
+            raise IndexError(item)
+        return int(self._graph.targets[self._edges][np.searchsorted(ends, item, side='right')])
+
+    def __len__(self):
+        return int(self._graph.multiplicities[self._edges].sum())
@@ -1,5 +1,12 @@
+import heapq
 import itertools
-from typing import Sequence
+import logging
+from collections import deque
+from typing import Sequence, Dict
+
+import numpy as np
+
+SCS_MEMORY_LIMIT = 1 << 26
 
 
 def overlap(a, b, min_length=5):
@@ -18,20 +25,72 @@ def overlap(a, b, min_length=5):
         start += 1  # move just past previous match
 
 
-def scs(ss: Sequence[str]):
+def scs(ss: Sequence[str], memory_limit=SCS_MEMORY_LIMIT):
     """ Returns shortest common superstring of given
-        strings, which must be the same length """
-    shortest_sup = None
-    for ssperm in itertools.permutations(ss):
-        sup = ssperm[0]  # superstring starts as first string
-        for i in range(len(ss) - 1):
-            # overlap adjacent strings A and B in the permutation
-            olen = overlap(ssperm[i], ssperm[i + 1], min_length=1)
-            # add non-overlapping portion of B to superstring
-            sup += ssperm[i + 1][olen:]
-        if shortest_sup is None or len(sup) < len(shortest_sup):
-            shortest_sup = sup  # found shorter superstring
-    return shortest_sup  # return shortest
+        strings, which must be the same length. Order of strings
+        is found by Held-Karp dynamic programming over subsets, the
+        first shortest one in order of permutations. If table of
+        subsets does not fit in memory_limit bytes, greedy merge is
+        used instead. """
+    ss = list(ss)
+    if not ss:
+        return ''
+    if _held_karp_table_size(len(ss)) > memory_limit:
+        logging.info(f"Too many strings for exact SCS ({len(ss)}), using greedy merge")
+        return greedy_scs(ss, k=1)
+    overlaps = np.array([[overlap(a, b, min_length=1) if i != j else 0 for j, b in enumerate(ss)]
+                         for i, a in enumerate(ss)], dtype=np.int32)
+    order = _best_order(overlaps, _held_karp(overlaps))
+    sup = ss[order[0]]  # superstring starts as first string
+    for i, j in zip(order, order[1:]):
+        # add non-overlapping portion of next string to superstring
+        sup += ss[j][overlaps[i, j]:]
+    return sup
+
+
+def _held_karp_table_size(n: int) -> int:
+    return (1 << n) * (n * np.dtype(np.int32).itemsize + 1)
+
+
+def _held_karp(overlaps: np.ndarray) -> np.ndarray:
+    """ table[subset, i] - greatest sum of overlaps of path starting with
+        string i through all strings of subset (bitmask), -1 if i is not in
+        subset. Subsets are filled by number of strings, all subsets of the
+        same size at once. """
+    n = len(overlaps)
+    subsets = np.arange(1 << n)
+    sizes = np.zeros(1 << n, dtype=np.int8)
+    for i in range(n):
+        sizes += (subsets >> i) & 1
+    table = np.full((1 << n, n), -1, dtype=np.int32)
+    table[1 << np.arange(n), np.arange(n)] = 0
+    for size in range(2, n + 1):
+        of_size = subsets[sizes == size]
+        for i in range(n):
+            with_i = of_size[(of_size >> i) & 1 == 1]
+            rest = with_i ^ (1 << i)
+            best = np.full(len(with_i), -1, dtype=np.int32)
+            for j in range(n):
+                if j != i:
+                    paths = np.where((rest >> j) & 1 == 1, overlaps[i, j] + table[rest, j], -1)
+                    np.maximum(best, paths, out=best)
+            table[with_i, i] = best
+    return table
+
+
+def _best_order(overlaps: np.ndarray, table: np.ndarray) -> [int]:
+    """ Lexicographically first order of strings having greatest sum of
+        overlaps """
+    subset = len(table) - 1
+    order = [int(np.argmax(table[subset]))]
+    while True:
+        current = order[-1]
+        total = table[subset, current]
+        subset ^= 1 << current
+        if not subset:
+            return order
+        order.append(next(j for j in range(len(overlaps))
+                          if subset >> j & 1 and overlaps[current, j] + table[subset, j] == total))
 
 
 def pick_maximal_overlap(reads, k):
@@ -51,12 +110,134 @@ def pick_maximal_overlap(reads, k):
 def greedy_scs(reads: Sequence[str], k=5):
     """ Greedy shortest-common-superstring merge.
         Repeat until no edges (overlaps of length >= k)
-        remain. """
-    reads = list(reads)
-    read_a, read_b, olen = pick_maximal_overlap(reads, k)
-    while olen > 0:
-        reads.remove(read_a)
-        reads.remove(read_b)
-        reads.append(read_a + read_b[-(len(read_b) - olen):])
-        read_a, read_b, olen = pick_maximal_overlap(reads, k)
-    return ''.join(reads)
+        remain. Merges are the same as if maximal overlap was picked
+        from all pairs after every merge, see `GreedyMerge`. """
+    return GreedyMerge(reads, k).super_string()
+
+
+class GreedyMerge:
+    """ Greedy merging of reads with overlaps found once with an index of
+        their k-mers and kept in a heap, after a merge only overlaps of
+        merged read are added.
+
+        Reads have ids in order of the list `pick_maximal_overlap` would
+        scan, merged read is appended at the end and `list.remove` drops
+        the first read of equal value, so picking the smallest
+        (-overlap, id a, id b) gives the same merges. Index keeps k-mers
+        of every read (owner) at position in read containing it now. """
+
+    def __init__(self, reads: Sequence[str], k: int):
+        self.k = k
+        self.values = []
+        self.alive = []
+        self.by_value = {}  # value -> deque of ids of alive reads, in order
+        self.prefixes = {}  # value[:k] -> ids of reads
+        self.windows = {}  # k-mer -> [(owner, position in owner)]
+        self.container = []  # owner -> id of alive read containing it
+        self.offset = []  # owner -> position in containing read
+        self.members = []  # id -> [(owner, position)]
+        self.lengths = []  # heap of (-length, id)
+        self.window_lengths = {len(read[:k]) for read in reads} - {0}
+        self.prefix_lengths = set()
+        self.heap = []
+        for read in reads:
+            read_id = self._add(read)
+            self._index(read_id, read, range(len(read)))
+        for read_id, read in enumerate(self.values):
+            self.heap.extend((-length, read_id, other_id) for other_id, length in self._overlaps_from(read_id).items())
+        heapq.heapify(self.heap)
+
+    def super_string(self) -> str:
+        while self.heap:
+            length, a, b = heapq.heappop(self.heap)
+            if self.alive[a] and self.alive[b]:
+                self._merge(self.values[a], self.values[b], -length)
+        return ''.join(value for value, alive in zip(self.values, self.alive) if alive)
+
+    def _add(self, value: str) -> int:
+        read_id = len(self.values)
+        self.values.append(value)
+        self.alive.append(True)
+        self.by_value.setdefault(value, deque()).append(read_id)
+        if value:
+            self.prefixes.setdefault(value[:self.k], []).append(read_id)
+            self.prefix_lengths.add(len(value[:self.k]))
+        self.container.append(read_id)
+        self.offset.append(0)
+        self.members.append([])
+        heapq.heappush(self.lengths, (-len(value), read_id))
+        return read_id
+
+    def _index(self, owner: int, value: str, positions: range):
+        """ Index k-mers of value starting at positions as owned by owner """
+        self.members[owner].append((owner, 0))
+        for length in self.window_lengths:
+            for position in positions:
+                if position + length <= len(value):
+                    self.windows.setdefault(value[position:position + length], []).append((owner, position))
+
+    def _remove(self, value: str) -> int:
+        read_id = self.by_value[value].popleft()
+        self.alive[read_id] = False
+        return read_id
+
+    def _merge(self, value_a: str, value_b: str, length: int):
+        a, b = self._remove(value_a), self._remove(value_b)
+        longest = self._longest_alive()
+        merged = value_a + value_b[-(len(value_b) - length):]
+        offset_b = len(merged) - len(value_b)
+        merged_id = self._add(merged)
+        self.alive[merged_id] = False  # until overlaps are found
+        for read_id, shift in ((a, 0), (b, offset_b)):
+            for owner, position in self.members[read_id]:
+                self.container[owner] = merged_id
+                self.offset[owner] = position + shift
+                self.members[merged_id].append((owner, position + shift))
+        # k-mers across the end of a not fully inside b, only if b is short
+        # or appended as a whole
+        self._index(merged_id, merged, range(max(len(value_a) - max(self.window_lengths, default=0) + 1, 0), offset_b))
+        into = self._overlaps_into(merged_id)
+        out = self._overlaps_from(merged_id, start=len(merged) - longest)
+        self.alive[merged_id] = True
+        for other_id, overlap_length in into.items():
+            heapq.heappush(self.heap, (-overlap_length, other_id, merged_id))
+        for other_id, overlap_length in out.items():
+            heapq.heappush(self.heap, (-overlap_length, merged_id, other_id))
+
+    def _longest_alive(self) -> int:
+        while self.lengths and not self.alive[self.lengths[0][1]]:
+            heapq.heappop(self.lengths)
+        return -self.lengths[0][0] if self.lengths else 0
+
+    def _overlaps_from(self, read_id: int, start: int = 0) -> Dict[int, int]:
+        """ {id: overlap(read, read with id)} of alive reads, only suffixes
+            starting at start or later are checked """
+        value = self.values[read_id]
+        overlaps = {}
+        for position in range(max(start, 0), len(value)):
+            suffix = value[position:]
+            for length in self.prefix_lengths:
+                for other_id in self.prefixes.get(value[position:position + length], ()):
+                    if self.alive[other_id] and other_id != read_id and other_id not in overlaps \
+                            and position + length <= len(value) and self.values[other_id].startswith(suffix):
+                        overlaps[other_id] = len(suffix)
+        return overlaps
+
+    def _overlaps_into(self, read_id: int) -> Dict[int, int]:
+        """ {id: overlap(read with id, read)} of alive reads """
+        value = self.values[read_id]
+        prefix = value[:self.k]
+        overlaps = {}
+        if len(prefix) not in self.window_lengths:
+            for other_id, other in enumerate(self.values):
+                if self.alive[other_id] and other_id != read_id:
+                    overlaps[other_id] = overlap(other, value, min_length=self.k)
+            return {other_id: length for other_id, length in overlaps.items() if length}
+        for owner, position in self.windows.get(prefix, ()):
+            other_id = self.container[owner]
+            if not self.alive[other_id] or other_id == read_id:
+                continue
+            suffix = self.values[other_id][self.offset[owner] + position:]
+            if len(suffix) > overlaps.get(other_id, 0) and value.startswith(suffix):
+                overlaps[other_id] = len(suffix)
+        return overlaps
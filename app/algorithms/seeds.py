@@ -0,0 +1,65 @@
+from typing import Sequence, Iterator, Tuple, List
+
+
+class SeedIndex:
+    """ Index of k-mer seeds built once over a collection of reads.
+        Maps every seed to the list of (read number, position) pairs
+        it occurs at, so candidate overlaps can be found by lookups
+        instead of comparing every read against every other read. """
+
+    def __init__(self, reads: Sequence[str], k: int, window: int = 1):
+        """
+        :param reads: sequence of reads
+        :param k: seed (k-mer) length
+        :param window: number of consecutive k-mers from which only the
+               minimizer is indexed. \n
+               **Use 1 to index every k-mer**
+        """
+        self.reads = reads
+        self.k = k
+        self.window = window
+        self.index = {}
+        for read_number, read in enumerate(reads):
+            for position, kmer in self.seeds(read):
+                self.index.setdefault(kmer, []).append((read_number, position))
+
+    def __len__(self):
+        return len(self.index)
+
+    def kmers(self, read: str) -> Iterator[Tuple[int, str]]:
+        """ Generate (position, k-mer) pairs of read """
+        for position in range(len(read) - (self.k - 1)):
+            yield position, read[position:position + self.k]
+
+    def seeds(self, read: str) -> Iterator[Tuple[int, str]]:
+        """ Generate (position, seed) pairs of read, all k-mers
+            or (window, k) minimizers depending on index settings """
+        if self.window == 1:
+            yield from self.kmers(read)
+            return
+        kmers = list(self.kmers(read))
+        last_position = None
+        for start in range(len(kmers) - (self.window - 1)):
+            position, kmer = min(kmers[start:start + self.window], key=lambda x: x[1])
+            if position != last_position:
+                last_position = position
+                yield position, kmer
+
+    def occurrences(self, kmer: str) -> List[Tuple[int, int]]:
+        return self.index.get(kmer, [])
+
+    def reads_containing(self, kmer: str) -> List[int]:
+        """ Return sorted numbers of reads containing given seed """
+        return sorted({read_number for read_number, _ in self.occurrences(kmer)})
+
+    def overlap_candidates(self, read: str, minimal_overlap: int) -> List[int]:
+        """ Return sorted numbers of reads sharing a seed with read, placed
+            so that a suffix of read could overlap a prefix of other read
+            by at least minimal_overlap characters """
+        candidates = set()
+        for position_a, kmer in self.seeds(read):
+            for read_number, position_b in self.occurrences(kmer):
+                shift = position_a - position_b
+                if shift >= 0 and len(read) - shift >= minimal_overlap:
+                    candidates.add(read_number)
+        return sorted(candidates)
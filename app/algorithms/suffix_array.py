@@ -0,0 +1,100 @@
+from typing import Sequence, List, Dict, Tuple
+
+
+def suffix_array(text: Sequence[int]) -> List[int]:
+    """ Build suffix array of text by prefix doubling.
+        Text is a sequence of comparable symbols (ints). """
+    n = len(text)
+    symbols = {symbol: rank for rank, symbol in enumerate(sorted(set(text)))}
+    rank = [symbols[symbol] for symbol in text]
+    sa = sorted(range(n), key=lambda i: rank[i])
+    k = 1
+    while n and rank[sa[-1]] < n - 1:
+        # pair of ranks (rank[i], rank[i + k]) packed into a single int
+        keys = [r * (n + 1) for r in rank]
+        for i in range(n - k):
+            keys[i] += rank[i + k] + 1
+        sa.sort(key=keys.__getitem__)
+        rank = [0] * n
+        for previous, current in zip(sa, sa[1:]):
+            rank[current] = rank[previous] + (keys[previous] != keys[current])
+        k *= 2
+    return sa
+
+
+def lcp_array(text: Sequence[int], sa: Sequence[int]) -> List[int]:
+    """ Kasai's algorithm, lcp[j] is the longest common prefix
+        of suffixes sa[j - 1] and sa[j] (lcp[0] == 0) """
+    n = len(text)
+    rank = [0] * n
+    for j, i in enumerate(sa):
+        rank[i] = j
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        if rank[i] > 0:
+            j = sa[rank[i] - 1]
+            while i + h < n and j + h < n and text[i + h] == text[j + h]:
+                h += 1
+            lcp[rank[i]] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
+    return lcp
+
+
+class GeneralizedSuffixArray:
+    """ Suffix array with LCP over all reads concatenated. Every read
+        is followed by its own unique separator, smaller than any base,
+        so no common prefix crosses a read boundary. """
+
+    def __init__(self, reads: Sequence[str]):
+        self.reads = reads
+        self.text = []
+        self.read_of_position = []
+        self.starts = []
+        for read_number, read in enumerate(reads):
+            self.starts.append(len(self.text))
+            self.text.extend(ord(c) for c in read)
+            self.text.append(-1 - read_number)
+            self.read_of_position.extend([read_number] * (len(read) + 1))
+        self.sa = suffix_array(self.text)
+        self.lcp = lcp_array(self.text, self.sa)
+
+    def suffix_prefix_overlaps(self, minimal_overlap: int) -> Dict[Tuple[int, int], int]:
+        """ Return {(read_a, read_b): length} of the longest suffix of read_a
+            equal to a prefix of read_b, for all overlaps >= minimal_overlap.
+
+            Single pass over the suffix array keeping a stack of whole read
+            suffixes that are a prefix of current suffix, so the cost is
+            O(total reads length + output). """
+        overlaps = {}
+        stack = []  # (read number, suffix length), lengths increasing
+        # read starts that are a prefix of current suffix, separators break
+        # ties in arbitrary order so equal suffixes may still follow them
+        pending = []
+        for j, position in enumerate(self.sa):
+            h = self.lcp[j]
+            while stack and stack[-1][1] > h:
+                stack.pop()
+            while pending and len(self.reads[pending[-1]]) > h:
+                pending.pop()
+            read_number = self.read_of_position[position]
+            length = self.starts[read_number] + len(self.reads[read_number]) - position
+            if length >= minimal_overlap:
+                stack.append((read_number, length))
+                self._add_overlaps([(read_number, length)], pending, overlaps)
+            if length and position == self.starts[read_number]:
+                self._add_overlaps(stack, [read_number], overlaps)
+                pending.append(read_number)
+        return overlaps
+
+    def _add_overlaps(self, suffixes, read_starts, overlaps):
+        """ Record every (read, suffix length) from suffixes not longer than
+            read from read_starts as an overlap; suffixes are sorted by
+            length, so the longest overlap of a pair is recorded last """
+        for read_b in read_starts:
+            for read_a, overlap in suffixes:
+                if read_a != read_b and overlap <= len(self.reads[read_b]):
+                    overlaps[read_a, read_b] = overlap
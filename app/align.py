@@ -0,0 +1,332 @@
+from collections import namedtuple
+from math import log
+from typing import Sequence, Tuple
+
+import click
+import numpy as np
+
+from algorithms.kmers import pack_windows
+from evaluate import Alignment, EvaluationResult, REVERSE, UNMAPPED, print_evaluation, score_alignments
+from io_utils import parse_input
+from read_store import ReadStore, ENCODING
+
+K = 15
+# k-mers occurring more often in reference are not used as seeds
+MAX_OCCURRENCES = 8
+# seeds this far from the best diagonal are used, so are indels up to this length
+BAND = 32
+# longer parts of contig between seeds end the alignment instead of being aligned
+MAX_GAP = 200
+# bowtie2 --local --mp 2,2 --rdg 10,2 --rfg 10,2, as in scripts/evaluate_bowtie.sh
+MATCH = 2
+MISMATCH = -2
+GAP_OPEN = -10
+GAP_EXTEND = -2
+# bowtie2 --local default --score-min G,20,8
+MIN_SCORE = 20
+MIN_SCORE_LOG_FACTOR = 8
+
+COMPLEMENT = str.maketrans('ACGTacgt', 'TGCAtgca')
+
+# exact match of query[query_start:query_end] at diagonal (reference position - query position)
+Block = namedtuple('Block', ['query_start', 'query_end', 'diagonal'])
+Placement = namedtuple('Placement', ['score', 'reference_start', 'cigar', 'md'])
+
+
+class ReferenceIndex:
+    """ Positions of k-mers of reference sequences in their concatenation,
+        sorted by packed k-mer. K-mers occurring more than max_occurrences
+        times are left out. """
+
+    def __init__(self, references: Sequence[str], k=K, max_occurrences=MAX_OCCURRENCES):
+        self.references = ReadStore.from_reads(references)
+        self.k = k
+        begin, end = int(self.references.offsets[0]), int(self.references.offsets[-1])
+        self.codes = ENCODING[self.references.buffer[begin:end]]
+        self.offsets = self.references.offsets - begin
+        packed, valid = pack_windows(self.references, k)
+        positions = np.flatnonzero(valid)
+        order = np.argsort(packed[positions], kind='stable')
+        kmers, positions = packed[positions][order], positions[order]
+        _, counts = np.unique(kmers, return_counts=True)
+        frequent = np.repeat(counts > max_occurrences, counts)
+        self.kmers, self.positions = kmers[~frequent], positions[~frequent]
+
+    @property
+    def lengths(self) -> [int]:
+        return self.references.lengths.tolist()
+
+    def hits(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """ Query and reference positions of every k-mer of query found in
+            reference """
+        packed, valid = pack_windows(ReadStore.from_reads([query]), self.k)
+        query_positions = np.flatnonzero(valid)
+        packed = packed[query_positions]
+        first = np.searchsorted(self.kmers, packed, side='left')
+        counts = np.searchsorted(self.kmers, packed, side='right') - first
+        ranks = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(query_positions, counts), self.positions[np.repeat(first, counts) + ranks]
+
+    def bounds(self, position: int) -> Tuple[int, int]:
+        """ Start and end of reference containing position """
+        number = int(np.searchsorted(self.offsets, position, side='right')) - 1
+        return int(self.offsets[number]), int(self.offsets[number + 1])
+
+
+def align_contigs(contigs: Sequence[str], index: ReferenceIndex) -> [Alignment]:
+    """ Best local alignment of every contig or its reverse complement, the
+        same alignments `evaluate` reads from SAM file """
+    return [align_contig(contig, index) for contig in contigs]
+
+
+def align_contig(contig: str, index: ReferenceIndex) -> Alignment:
+    forward = _place(contig, index)
+    reverse = _place(contig.translate(COMPLEMENT)[::-1], index)
+    flag = 0
+    if reverse is not None and (forward is None or reverse.score > forward.score):
+        forward, flag = reverse, REVERSE
+    if forward is None or forward.score < MIN_SCORE + MIN_SCORE_LOG_FACTOR * log(max(len(contig), 1)):
+        return Alignment(flag=UNMAPPED, reference_start=-1, cigar=[], query_length=len(contig), md=None)
+    reference_start, _ = index.bounds(forward.reference_start)
+    return Alignment(
+        flag=flag,
+        reference_start=forward.reference_start - reference_start,
+        cigar=forward.cigar,
+        query_length=len(contig),
+        md=forward.md,
+    )
+
+
+def evaluate_contigs(contigs: Sequence[str], references: Sequence[str] or ReferenceIndex) -> EvaluationResult:
+    """ Score contigs aligned to references without bowtie2 """
+    index = references if isinstance(references, ReferenceIndex) else ReferenceIndex(references)
+    return score_alignments(index.lengths, align_contigs(contigs, index))
+
+
+def _place(query: str, index: ReferenceIndex) -> Placement or None:
+    """ Alignment of query along chain of exact matches around the
+        diagonal having most seeds, extended without gaps at both ends """
+    chain = _chain(query, index)
+    if not chain:
+        return None
+    codes = ENCODING[np.frombuffer(query.encode(), dtype=np.uint8)]
+    builder = _Builder(codes, index.codes)
+    first, last = chain[0], chain[-1]
+    reference_begin, reference_end = index.bounds(first.query_start + first.diagonal)
+    left = _extension(codes[:first.query_start][::-1],
+                      index.codes[reference_begin:first.query_start + first.diagonal][::-1])
+    right = _extension(codes[last.query_end:], index.codes[last.query_end + last.diagonal:reference_end])
+    query_start = first.query_start - left
+    builder.aligned(query_start, query_start + first.diagonal, left)
+    previous = None
+    for block in chain:
+        if previous is not None:
+            builder.gap(previous.query_end, previous.query_end + previous.diagonal,
+                        block.query_start, block.query_start + block.diagonal)
+        builder.aligned(block.query_start, block.query_start + block.diagonal, block.query_end - block.query_start)
+        previous = block
+    builder.aligned(last.query_end, last.query_end + last.diagonal, right)
+    return Placement(
+        score=builder.score,
+        reference_start=query_start + first.diagonal,
+        cigar=builder.cigar(query_start, len(query) - last.query_end - right),
+        md=builder.md(),
+    )
+
+
+def _chain(query: str, index: ReferenceIndex) -> [Block]:
+    """ Exact matches near the diagonal with most seeds, in order along
+        both query and reference """
+    query_hits, reference_hits = index.hits(query)
+    if not len(query_hits):
+        return []
+    diagonals = reference_hits - query_hits
+    buckets, counts = np.unique(diagonals // BAND, return_counts=True)
+    best = diagonals[diagonals // BAND == buckets[np.argmax(counts)]]
+    near = np.abs(diagonals - int(np.median(best))) <= BAND
+    chain = []
+    for block in _blocks(query_hits[near], diagonals[near], index.k):
+        if chain:
+            previous = chain[-1]
+            start = max(block.query_start, previous.query_end, previous.query_end + previous.diagonal - block.diagonal)
+            if start >= block.query_end:
+                continue
+            block = block._replace(query_start=start)
+        chain.append(block)
+    return _longest_part(chain)
+
+
+def _blocks(query_hits: np.ndarray, diagonals: np.ndarray, k: int) -> [Block]:
+    """ Runs of hits at consecutive query positions of the same diagonal,
+        sorted by query start """
+    order = np.lexsort((query_hits, diagonals))
+    query_hits, diagonals = query_hits[order], diagonals[order]
+    starts = np.flatnonzero(np.concatenate(([True], (np.diff(diagonals) != 0) | (np.diff(query_hits) > 1))))
+    ends = np.append(starts[1:], len(order)) - 1
+    blocks = [
+        Block(query_start, query_end + k, diagonal)
+        for query_start, query_end, diagonal in zip(
+            query_hits[starts].tolist(), query_hits[ends].tolist(), diagonals[starts].tolist(),
+        )
+    ]
+    return sorted(blocks)
+
+
+def _longest_part(chain: [Block]) -> [Block]:
+    """ Part of chain between gaps longer than MAX_GAP, which has the most
+        matched bases """
+    parts = [[]]
+    for block in chain:
+        if parts[-1]:
+            previous = parts[-1][-1]
+            gap = max(block.query_start - previous.query_end,
+                      block.query_start + block.diagonal - previous.query_end - previous.diagonal)
+            if gap > MAX_GAP:
+                parts.append([])
+        parts[-1].append(block)
+    return max(parts, key=lambda part: sum(block.query_end - block.query_start for block in part))
+
+
+def _extension(query_codes: np.ndarray, reference_codes: np.ndarray) -> int:
+    """ Length of the best scoring ungapped extension, 0 if none scores """
+    length = min(len(query_codes), len(reference_codes))
+    if not length:
+        return 0
+    matches = (query_codes[:length] == reference_codes[:length]) & (query_codes[:length] < 4)
+    scores = np.cumsum(np.where(matches, MATCH, MISMATCH))
+    best = int(np.argmax(scores))
+    return best + 1 if scores[best] > 0 else 0
+
+
+class _Builder:
+    """ CIGAR, MD tag and score of alignment built from its consecutive
+        aligned parts and gaps """
+
+    def __init__(self, query_codes: np.ndarray, reference_codes: np.ndarray):
+        self.query_codes = query_codes
+        self.reference_codes = reference_codes
+        self.operations = []
+        self.md_parts = []
+        self.matches = 0
+        self.score = 0
+
+    def _operation(self, operation: str, length: int):
+        if self.operations and self.operations[-1][0] == operation:
+            self.operations[-1] = (operation, self.operations[-1][1] + length)
+        else:
+            self.operations.append((operation, length))
+
+    def aligned(self, query_start: int, reference_start: int, length: int):
+        if length <= 0:
+            return
+        query = self.query_codes[query_start:query_start + length]
+        reference = self.reference_codes[reference_start:reference_start + length]
+        mismatches = np.flatnonzero((query != reference) | (query > 3)).tolist()
+        previous = -1
+        for mismatch in mismatches:
+            self.md_parts.append(f'{self.matches + mismatch - previous - 1}{_base(reference[mismatch])}')
+            self.matches = 0
+            previous = mismatch
+        self.matches += length - previous - 1
+        self.score += MATCH * (length - len(mismatches)) + MISMATCH * len(mismatches)
+        self._operation('M', length)
+
+    def inserted(self, length: int):
+        if length > 0:
+            self.score += GAP_OPEN + GAP_EXTEND * length
+            self._operation('I', length)
+
+    def deleted(self, reference_start: int, length: int):
+        if length > 0:
+            bases = ''.join(map(_base, self.reference_codes[reference_start:reference_start + length]))
+            self.md_parts.append(f'{self.matches}^{bases}')
+            self.matches = 0
+            self.score += GAP_OPEN + GAP_EXTEND * length
+            self._operation('D', length)
+
+    def gap(self, query_start: int, reference_start: int, query_end: int, reference_end: int):
+        """ Align query and reference between two exact matches """
+        for operation, length in _global_alignment(self.query_codes[query_start:query_end],
+                                                   self.reference_codes[reference_start:reference_end]):
+            if operation == 'M':
+                self.aligned(query_start, reference_start, length)
+            elif operation == 'I':
+                self.inserted(length)
+            else:
+                self.deleted(reference_start, length)
+            query_start += length if operation != 'D' else 0
+            reference_start += length if operation != 'I' else 0
+
+    def cigar(self, left_clip: int, right_clip: int) -> [Tuple[str, int]]:
+        clips = [('S', left_clip)] if left_clip else []
+        return clips + self.operations + ([('S', right_clip)] if right_clip else [])
+
+    def md(self) -> str:
+        return ''.join(self.md_parts) + str(self.matches)
+
+
+def _base(code: int) -> str:
+    return 'ACGTN'[min(int(code), 4)]
+
+
+def _global_alignment(query: np.ndarray, reference: np.ndarray) -> [Tuple[str, int]]:
+    """ Operations of best global alignment with affine gaps (Gotoh) """
+    n, m = len(query), len(reference)
+    if not n or not m:
+        return [('I', n)] if n else [('D', m)] if m else []
+    worst = float('-inf')
+    # best score ending with aligned pair, insertion (query base) and deletion
+    aligned = [[worst] * (m + 1) for _ in range(n + 1)]
+    inserted = [[worst] * (m + 1) for _ in range(n + 1)]
+    deleted = [[worst] * (m + 1) for _ in range(n + 1)]
+    aligned[0][0] = 0
+    for i in range(1, n + 1):
+        inserted[i][0] = GAP_OPEN + GAP_EXTEND * i
+    for j in range(1, m + 1):
+        deleted[0][j] = GAP_OPEN + GAP_EXTEND * j
+    query, reference = query.tolist(), reference.tolist()
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            pair = MATCH if query[i - 1] == reference[j - 1] < 4 else MISMATCH
+            aligned[i][j] = max(aligned[i - 1][j - 1], inserted[i - 1][j - 1], deleted[i - 1][j - 1]) + pair
+            inserted[i][j] = max(max(aligned[i - 1][j], deleted[i - 1][j]) + GAP_OPEN, inserted[i - 1][j]) + GAP_EXTEND
+            deleted[i][j] = max(max(aligned[i][j - 1], inserted[i][j - 1]) + GAP_OPEN, deleted[i][j - 1]) + GAP_EXTEND
+    return _traceback({'M': aligned, 'I': inserted, 'D': deleted}, n, m)
+
+
+def _traceback(matrices: dict, n: int, m: int) -> [Tuple[str, int]]:
+    inserted, deleted = matrices['I'], matrices['D']
+    i, j = n, m
+    state = max(matrices, key=lambda name: matrices[name][n][m])
+    operations = []
+    while i or j:
+        operations.append(state)
+        if state == 'M':
+            i, j = i - 1, j - 1
+            state = max(matrices, key=lambda name: matrices[name][i][j])
+        elif state == 'I':
+            i -= 1
+            if inserted[i + 1][j] != inserted[i][j] + GAP_EXTEND:
+                state = max('MD', key=lambda name: matrices[name][i][j])
+        else:
+            j -= 1
+            if deleted[i][j + 1] != deleted[i][j] + GAP_EXTEND:
+                state = max('MI', key=lambda name: matrices[name][i][j])
+    runs = []
+    for operation in reversed(operations):
+        if runs and runs[-1][0] == operation:
+            runs[-1][1] += 1
+        else:
+            runs.append([operation, 1])
+    return [tuple(run) for run in runs]
+
+
+@click.command()
+@click.argument('contigs_file_name')
+@click.argument('reference_file_name')
+def _evaluate(contigs_file_name, reference_file_name):
+    print_evaluation(evaluate_contigs(parse_input(contigs_file_name), parse_input(reference_file_name)))
+
+
+if __name__ == '__main__':
+    _evaluate()
@@ -1,9 +1,17 @@
+import logging
+
 import click
 
-from algorithms import algorithms
+from algorithms import algorithms, parallel_algorithms, cached_algorithms, paired_algorithms
 from algorithms.error_corrections import CorrectedReads
-from io_utils import dump_output
-from io_utils import parse_input
+from align import evaluate_contigs
+from cache import Cache
+from evaluate import print_evaluation
+from io_utils import ORIENTATIONS, dump_output
+from io_utils import parse_input, parse_inputs
+from profiling import Profiler, counter, profiling, stage
+import progress
+from utils import n50
 
 DEFAULT_ALGORITHM = 'OLC'
 
@@ -14,17 +22,90 @@ DEFAULT_ALGORITHM = 'OLC'
 @click.option('--algorithm', required=False, default=DEFAULT_ALGORITHM,
               type=click.Choice([key for key in algorithms.keys()]))
 @click.option('--no-error_correction', is_flag=True)
-def _assembly(input_file_name, output_file_name, algorithm, no_error_correction):
-    return assembly(input_file_name, output_file_name, algorithm, error_correction=not no_error_correction)
+@click.option('--reads', 'more_input_file_names', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='Another library of reads, may be given many times. Like input file, it may have mates one '
+                   'after another.')
+@click.option('--pairs', 'paired_file_names', multiple=True, nargs=2, type=click.Path(exists=True, dir_okay=False),
+              help='Library of mates in two files, may be given many times.')
+@click.option('--orientation', required=False, default='fr', type=click.Choice(ORIENTATIONS),
+              help='Whether second mates are read from the other strand (fr) or the same strand (ff).')
+@click.option('--workers', required=False, default=1, type=click.IntRange(min=1),
+              help='Number of processes, single process by default.')
+@click.option('--cache-dir', required=False, default=None, type=click.Path(file_okay=False),
+              help='Directory for k-mer histograms, corrected reads and overlaps reused by later runs.')
+@click.option('--reference', 'reference_file_name', required=False, default=None,
+              type=click.Path(exists=True, dir_okay=False),
+              help='Reference to evaluate contigs against, without bowtie2.')
+@click.option('--profile', 'profile_file_name', required=False, default=None, type=click.Path(dir_okay=False),
+              help='JSON file with time, memory and counters of every stage.')
+@click.option('--cprofile-dir', required=False, default=None, type=click.Path(file_okay=False),
+              help='Directory for cProfile dumps of every stage.')
+@click.option('--progress', 'progress_mode', required=False, default='auto', type=click.Choice(progress.MODES),
+              help='Progress as bar, log records or none, by default bar on terminal and log otherwise.')
+def _assembly(input_file_name, output_file_name, algorithm, no_error_correction, more_input_file_names,
+              paired_file_names, orientation, workers, cache_dir, reference_file_name, profile_file_name,
+              cprofile_dir, progress_mode):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    progress.configure(progress_mode)
+    evaluation = assembly([input_file_name, *more_input_file_names], output_file_name, algorithm,
+                          error_correction=not no_error_correction, workers=workers, cache_dir=cache_dir,
+                          reference_file_name=reference_file_name, profile_file_name=profile_file_name,
+                          cprofile_dir=cprofile_dir, paired_file_names=paired_file_names, orientation=orientation)
+    if evaluation is not None:
+        print_evaluation(evaluation)
+
+
+def assembly(input_file_name, output_file_name, algorithm, error_correction, workers=1, cache_dir=None,
+             reference_file_name=None, profile_file_name=None, cprofile_dir=None, paired_file_names=(),
+             orientation='fr'):
+    """ Assemble reads of input file, or of list of them, and of pairs of
+        files with mates into contigs of output file. Contigs are joined
+        into scaffolds by mates, if the algorithm supports it. With
+        reference given, the contigs are evaluated against it. With
+        profile file or cProfile directory given, stages are profiled. """
+    input_file_names = [input_file_name] if isinstance(input_file_name, str) else list(input_file_name)
+    arguments = (input_file_names, paired_file_names, orientation, output_file_name, algorithm, error_correction,
+                 workers, cache_dir, reference_file_name)
+    if profile_file_name is None and cprofile_dir is None:
+        return _run_assembly(*arguments)
+    profiler = Profiler(cprofile_dir)
+    with profiling(profiler):
+        evaluation = _run_assembly(*arguments)
+    if profile_file_name is not None:
+        profiler.dump(profile_file_name)
+    return evaluation
 
 
-def assembly(input_file_name, output_file_name, algorithm, error_correction):
-    data = parse_input(input_file_name)
+def _run_assembly(input_file_names, paired_file_names, orientation, output_file_name, algorithm, error_correction,
+                  workers, cache_dir, reference_file_name):
+    with stage('parse'):
+        data, pairs = parse_inputs(input_file_names, paired_file_names, orientation)
+        counter('reads', len(data))
+        counter('bases', int(data.lengths.sum()))
+        counter('pairs', sum(len(library) for library in pairs))
+    cache = Cache(cache_dir) if cache_dir else None
     if error_correction:
-        data = CorrectedReads(data)
+        data = CorrectedReads(data, workers=workers, cache=cache)
     do_assembly = algorithms[algorithm]
-    result = do_assembly(data)
-    dump_output(output_file_name, result)
+    options = {}
+    if algorithm in parallel_algorithms:
+        options['workers'] = workers
+    if algorithm in cached_algorithms:
+        options['cache'] = cache
+    if algorithm in paired_algorithms:
+        options['pairs'] = pairs
+    with stage('assembly'):
+        result = do_assembly(data, **options)
+    contigs = [result] if isinstance(result, str) else result
+    counter('contigs', len(contigs))
+    counter('n50', n50([len(contig) for contig in contigs]))
+    with stage('output'):
+        dump_output(output_file_name, result)
+    if reference_file_name is not None:
+        with stage('evaluation'):
+            evaluation = evaluate_contigs(contigs, parse_input(reference_file_name))
+            counter('overall_score', evaluation.overall_score)
+        return evaluation
 
 
 if __name__ == '__main__':
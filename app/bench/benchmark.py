@@ -0,0 +1,199 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import tempfile
+from collections import namedtuple
+from time import time
+from typing import Sequence
+
+import click
+import numpy as np
+
+from algorithms import algorithms
+from align import evaluate_contigs
+from assembly import assembly
+from bench.simulate import simulate_reads
+from io_utils import dump_output, parse_input
+from progress import configure as configure_progress
+from utils import n50
+
+# README: 1000 reads of typical parameters in 1 h and 0.5 GB
+BUDGET_SECONDS = 60 * 60
+BUDGET_BYTES = 512 * 1024 * 1024
+
+BenchmarkResult = namedtuple('BenchmarkResult', [
+    'algorithm',
+    'error_correction',
+    'seconds',
+    'peak_rss',
+    'contigs',
+    'total_length',
+    'n50',
+    'score',
+    'error',
+])
+
+
+def peak_rss() -> int:
+    """ Peak resident memory in bytes of this process or any of its
+        finished children, whichever is greater. In a forked process it
+        also counts pages inherited from the parent that the child has
+        touched, so it is an upper bound of what the run itself used. """
+    return 1024 * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def run_benchmark(input_file_name: str, reference_file_name: str, algorithm: str, error_correction: bool, workers=1,
+                  timeout=BUDGET_SECONDS) -> BenchmarkResult:
+    """ Assemble input file in a forked process, so that its peak memory is
+        measured apart from other runs, and score contigs against reference.
+        Run taking longer than timeout is killed. A crashed run, killed for
+        lack of memory for example, is recorded with its exit code. """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_measure, args=(sender, input_file_name, reference_file_name, algorithm, error_correction, workers),
+    )
+    start = time()
+    process.start()
+    sender.close()
+    if not receiver.poll(timeout):
+        process.terminate()
+        process.join()
+        return BenchmarkResult(algorithm, error_correction, time() - start, None, 0, 0, 0, None, 'timeout')
+    try:
+        result = receiver.recv()
+    except EOFError:
+        # child died without sending anything
+        process.join()
+        return BenchmarkResult(algorithm, error_correction, time() - start, None, 0, 0, 0, None,
+                               f'exit code {process.exitcode}')
+    process.join()
+    return result
+
+
+def _measure(sender, input_file_name: str, reference_file_name: str, algorithm: str, error_correction: bool,
+             workers: int):
+    configure_progress('silent')
+    with tempfile.NamedTemporaryFile(suffix='.fasta') as output:
+        start = time()
+        try:
+            assembly(input_file_name, output.name, algorithm, error_correction, workers=workers)
+        except Exception as exception:
+            sender.send(BenchmarkResult(algorithm, error_correction, time() - start, peak_rss(), 0, 0, 0, None,
+                                        repr(exception)))
+            return
+        seconds = time() - start
+        memory = peak_rss()
+        contigs = parse_input(output.name)
+        lengths = contigs.lengths.tolist()
+        score = evaluate_contigs(contigs, parse_input(reference_file_name)).overall_score
+    sender.send(BenchmarkResult(
+        algorithm=algorithm,
+        error_correction=error_correction,
+        seconds=seconds,
+        peak_rss=memory,
+        contigs=len(lengths),
+        total_length=sum(lengths),
+        n50=n50(lengths),
+        score=score,
+        error=None,
+    ))
+
+
+def over_budget(result: BenchmarkResult) -> bool:
+    return result.error is not None or result.seconds > BUDGET_SECONDS or result.peak_rss > BUDGET_BYTES
+
+
+def benchmark(parameters: dict, algorithm_names: Sequence[str], workers=1, timeout=BUDGET_SECONDS) -> dict:
+    """ Run every algorithm on simulated reads with and without error
+        correction """
+    simulation = simulate_reads(**parameters)
+    with tempfile.NamedTemporaryFile(suffix='.fasta') as reads_file, \
+            tempfile.NamedTemporaryFile(suffix='.fasta') as reference_file:
+        dump_output(reads_file.name, simulation.reads)
+        dump_output(reference_file.name, simulation.reference)
+        results = []
+        for algorithm in algorithm_names:
+            for error_correction in (False, True):
+                result = run_benchmark(reads_file.name, reference_file.name, algorithm, error_correction, workers,
+                                       timeout)
+                results.append(result)
+                _print_result(result)
+    return {
+        'parameters': dict(parameters, reads=len(simulation.reads)),
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'cpus': os.cpu_count()},
+        'budget': {'seconds': BUDGET_SECONDS, 'bytes': BUDGET_BYTES},
+        'results': [result._asdict() for result in results],
+    }
+
+
+def compare(report: dict, baseline: dict):
+    """ Print ratios of time, memory and N50 to runs of baseline report """
+    baseline_results = {
+        (result['algorithm'], result['error_correction']): result for result in baseline['results']
+    }
+    for result in report['results']:
+        previous = baseline_results.get((result['algorithm'], result['error_correction']))
+        if previous is None or result['error'] or previous['error']:
+            continue
+        ratios = [
+            result[field] / previous[field] if previous[field] else float('nan')
+            for field in ('seconds', 'peak_rss', 'n50')
+        ]
+        print(f"{_label(result)} time x{ratios[0]:.2f} memory x{ratios[1]:.2f} N50 x{ratios[2]:.2f}")
+
+
+def _label(result) -> str:
+    algorithm, error_correction = result['algorithm'], result['error_correction']
+    return f"{algorithm:<16} {'corrected' if error_correction else 'raw':<9}"
+
+
+def _print_result(result: BenchmarkResult):
+    if result.error:
+        print(f"{_label(result._asdict())} failed after {result.seconds:.2f}s: {result.error}")
+    else:
+        print(f"{_label(result._asdict())} {result.seconds:8.2f}s {result.peak_rss / 2 ** 20:8.1f}MB "
+              f"{result.contigs:6} contigs N50 {result.n50:6} score {result.score:.3f}")
+
+
+@click.command()
+@click.option('--reference-length', default=5000, type=click.IntRange(min=1))
+@click.option('--coverage', default=20, type=click.IntRange(min=1))
+@click.option('--read-length', default=100, type=click.IntRange(min=1))
+@click.option('--error-rate', default=0.01, type=float)
+@click.option('--seed', default=0)
+@click.option('--algorithm', 'algorithm_names', multiple=True, type=click.Choice(list(algorithms.keys())),
+              help='Algorithm to run, may be given many times. All of them by default.')
+@click.option('--workers', default=1, type=click.IntRange(min=1))
+@click.option('--timeout', default=BUDGET_SECONDS, type=click.IntRange(min=1),
+              help='Seconds after which a run is killed.')
+@click.option('--output', default='benchmark.json', type=click.Path(dir_okay=False),
+              help='JSON file with parameters and results.')
+@click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='JSON file of earlier benchmark to compare with.')
+def _benchmark(reference_length, coverage, read_length, error_rate, seed, algorithm_names, workers, timeout, output,
+               baseline):
+    parameters = {
+        'reference_length': reference_length,
+        'coverage': coverage,
+        'read_length': read_length,
+        'error_rate': error_rate,
+        'seed': seed,
+    }
+    report = benchmark(parameters, algorithm_names or list(algorithms.keys()), workers, timeout)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            compare(report, json.load(f))
+    over = [result for result in report['results'] if over_budget(BenchmarkResult(**result))]
+    for result in over:
+        print(f"{_label(result)} is over budget of {BUDGET_SECONDS}s and {BUDGET_BYTES // 2 ** 20}MB")
+    if over:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    _benchmark()
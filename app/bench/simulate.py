@@ -0,0 +1,22 @@
+from collections import namedtuple
+
+import numpy as np
+
+BASES = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+Simulation = namedtuple('Simulation', ['reference', 'reads'])
+
+
+def simulate_reads(reference_length=5000, coverage=20, read_length=100, error_rate=0.01, seed=0) -> Simulation:
+    """ Reads of random reference starting at uniformly drawn positions,
+        as many as needed for the average coverage. Every base of a read is
+        replaced by another one with probability error_rate. """
+    assert reference_length >= read_length
+    rng = np.random.RandomState(seed)
+    reference = rng.randint(0, 4, size=reference_length)
+    number_of_reads = max(1, coverage * reference_length // read_length)
+    starts = np.sort(rng.randint(0, reference_length - read_length + 1, size=number_of_reads))
+    reads = reference[starts[:, np.newaxis] + np.arange(read_length)]
+    errors = rng.random_sample(reads.shape) < error_rate
+    reads[errors] = (reads[errors] + rng.randint(1, 4, size=int(errors.sum()))) % 4
+    return Simulation(BASES[reference].tobytes().decode(), [BASES[read].tobytes().decode() for read in reads])
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Callable, Dict, Sequence
+from zipfile import BadZipFile
+
+import numpy as np
+
+from read_store import ReadStore
+
+CACHE_SIZE = 1 << 30
+SUFFIX = '.npz'
+
+Arrays = Dict[str, np.ndarray]
+
+
+def reads_digest(reads: Sequence[str]) -> str:
+    """ Hash of content of reads, names are not included """
+    reads = ReadStore.from_reads(reads)
+    begin, end = int(reads.offsets[0]), int(reads.offsets[-1])
+    digest = hashlib.sha256()
+    digest.update((reads.offsets - begin).astype('<i8').tobytes())
+    digest.update(reads.buffer[begin:end].tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    """ Key of parts, such as name and parameters of stage and digest of
+        its input """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class Cache:
+    """ Directory of named arrays stored as .npz files by key. When the
+        files take more than max_bytes, least recently used are removed. """
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Arrays or None:
+        path = self.path(key)
+        try:
+            with np.load(path) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, BadZipFile):
+            logging.info(f"Removing broken cache file {path}")
+            os.remove(path)
+            return None
+        os.utime(path)
+        return arrays
+
+    def put(self, key: str, **arrays: np.ndarray):
+        """ Write arrays to a temporary file first, so that concurrent runs
+            never see a partial file """
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict(keep=key)
+
+    def fetch(self, key: str, compute: Callable[[], Arrays]) -> Arrays:
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = compute()
+            self.put(key, **arrays)
+        else:
+            logging.info(f"Using cached {key}")
+        return arrays
+
+    def evict(self, keep: str = None):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(SUFFIX) and name != f'{keep}{SUFFIX}':
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(self.path(keep)):
+            total += os.path.getsize(self.path(keep))
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory) if name.endswith(SUFFIX))
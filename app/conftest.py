@@ -0,0 +1,14 @@
+import random
+
+import pytest
+
+
+@pytest.fixture
+def reference():
+    rng = random.Random(0)
+    return ''.join(rng.choice('ACGT') for _ in range(5000))
+
+
+@pytest.fixture
+def reads(reference):
+    return [reference[start:start + 60] for start in range(0, 540, 15)]
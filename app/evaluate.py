@@ -4,12 +4,29 @@ Created on Mon Dec 18 11:58:16 2017
 @author: norbert
 """
 
+import os
+import re
+from bisect import bisect_right
 from collections import namedtuple
+from typing import IO, Iterable, Tuple
 
-import pysam
+import numpy as np
 from math import log
 
 MINLEN = 300
+BAM_MAGIC = b'\x1f\x8b'
+
+UNMAPPED = 0x4
+REVERSE = 0x10
+SECONDARY = 0x100
+
+CIGAR_OPERATIONS = 'MIDNSHP=XB'
+CIGAR = re.compile(r'(\d+)([MIDNSHP=X])')
+MD = re.compile(r'(\d+)|\^[A-Za-z]+|([A-Za-z])')
+# operations counted by pysam `infer_read_length`, consuming reference and aligning bases
+READ_OPERATIONS = set('MIS=XH')
+REFERENCE_OPERATIONS = set('MDN=X')
+ALIGNED_OPERATIONS = set('M=X')
 
 EvaluationResult = namedtuple('EvaluationResult', [
     'reference_coverage',
@@ -21,71 +38,43 @@ EvaluationResult = namedtuple('EvaluationResult', [
     'overall_score',
 ])
 
+Alignment = namedtuple('Alignment', ['flag', 'reference_start', 'cigar', 'query_length', 'md'])
+
+
+def evaluate(sam_data: str or IO) -> EvaluationResult:
+    """ Score contigs aligned to reference. sam_data is a path of SAM or BAM
+        file or a file-like object with SAM text (str or bytes lines). """
+    return score_alignments(*read_alignments(sam_data))
 
-def evaluate(sam_data):  # noqa C901
-    samfile = pysam.AlignmentFile(sam_data)
-    reftotlen = sum(samfile.lengths)
+
+def score_alignments(reference_lengths: [int], alignments: Iterable[Alignment]) -> EvaluationResult:
+    reftotlen = sum(reference_lengths)
     rdstotlen = 0
 
     reads = []
-    fragments = []
-    for read in samfile.fetch(until_eof=True):
-        if read.is_unmapped:
-            rdstotlen += read.query_length
-        else:
-            if not read.is_secondary:
-                rdstotlen += read.infer_read_length()
-            if read.reference_length >= MINLEN:
-                reads.append(read)
-                fragments.append((read.reference_start, read.reference_end))
-    samfile.close()
-
-    contig_overlaps = []
-    for i, frag1 in enumerate(fragments):
-        for frag2 in fragments[i + 1:]:
-            s, e = max(frag1[0], frag2[0]), min(frag1[1], frag2[1])
-            if s < e:
-                contig_overlaps.append((s, e))
-    contig_overlaps.sort()
-
-    redundant = []
-    ls, le = -1, -1
-    for cs, ce in contig_overlaps:
-        if cs <= le:
-            le = max(le, ce)
-        else:
-            if le >= 0:
-                redundant.append((ls, le))
-            ls, le = cs, ce
-    if le >= 0:
-        redundant.append((ls, le))
-
+    for alignment in alignments:
+        if alignment.flag & UNMAPPED:
+            rdstotlen += alignment.query_length
+            continue
+        if not alignment.flag & SECONDARY:
+            rdstotlen += sum(length for operation, length in alignment.cigar if operation in READ_OPERATIONS)
+        reference_length = sum(length for operation, length in alignment.cigar if operation in REFERENCE_OPERATIONS)
+        if reference_length >= MINLEN:
+            reads.append((alignment.reference_start, alignment.reference_start + reference_length, alignment))
+
+    redundant = redundant_regions([(s, e) for s, e, _ in reads])
+    redundant_ends = [region_end for _, region_end in redundant]
     almtotlen = 0
     almmmcount = 0
     almcount = 0
-    for read in reads:
-        s, e = read.reference_start, read.reference_end
-        alms = s
-        alpairs = read.get_aligned_pairs(True, True)
-        for rs, re in redundant + [(e, e)]:
-            if alms < rs:
-                alme = min(e, rs)
-                if alme - alms >= MINLEN:
-                    almtotlen += alme - alms
-                    almcount += 1
-                    i = alms - s
-                    while alpairs[i][1] is None or alpairs[i][1] < alms:
-                        i += 1
-                    while i < len(alpairs) and (alpairs[i][1] is None or alpairs[i][1] < alme):
-                        if alpairs[i][1] is None or alpairs[i][2] is None or alpairs[i][2].islower():
-                            almmmcount += 1
-                        i += 1
-            if re < e:
-                alms = max(alms, re)
-            else:
-                break
-
-    almtotlen = almtotlen
+    for s, e, alignment in reads:
+        mismatch_indices, mismatch_positions = mismatches(alignment)
+        for alms, alme in unique_segments(s, e, redundant, redundant_ends):
+            almtotlen += alme - alms
+            almcount += 1
+            # aligned bases are counted from the (alms - s)-th one on
+            almmmcount += int(np.count_nonzero((mismatch_indices >= alms - s) & (mismatch_positions < alme)))
+
     refcoverage = almtotlen / reftotlen if almtotlen else 0
     rdscoverage = almtotlen / rdstotlen if almtotlen else 0
     ident_score = max(0.5, 1 - 10 * almmmcount / almtotlen) if almtotlen else 0
@@ -103,10 +92,117 @@ def evaluate(sam_data):  # noqa C901
     )
 
 
-if __name__ == '__main__':
-    import sys
-
-    result = evaluate(sys.stdin)
+def redundant_regions(fragments: [Tuple[int, int]]) -> [Tuple[int, int]]:
+    """ Sorted regions covered by at least two fragments, touching ones
+        merged. Coverage is swept once over sorted fragment bounds. """
+    if not fragments:
+        return []
+    starts, ends = (np.sort(bounds) for bounds in np.array(fragments, dtype=np.int64).T)
+    coordinates = np.union1d(starts, ends)
+    depth = np.searchsorted(starts, coordinates, side='right') - np.searchsorted(ends, coordinates, side='right')
+    # depth[i] is coverage of coordinates[i]:coordinates[i + 1]
+    covered = np.concatenate([[False], depth[:-1] >= 2, [False]])
+    changes = np.flatnonzero(covered[1:] != covered[:-1])
+    return list(zip(coordinates[changes[::2]].tolist(), coordinates[changes[1::2]].tolist()))
+
+
+def unique_segments(s: int, e: int, redundant: [Tuple[int, int]], redundant_ends: [int]) -> [Tuple[int, int]]:
+    """ Parts of s:e outside of redundant regions at least MINLEN long """
+    segments = []
+    alms = s
+    for region_start, region_end in redundant[bisect_right(redundant_ends, s):]:
+        if region_start >= e:
+            break
+        if region_start - alms >= MINLEN:
+            segments.append((alms, region_start))
+        alms = max(alms, region_end)
+        if alms >= e:
+            break
+    if e - alms >= MINLEN:
+        segments.append((alms, e))
+    return segments
+
+
+def mismatches(alignment: Alignment) -> Tuple[np.ndarray, np.ndarray]:
+    """ Indices among aligned bases and reference positions of mismatches
+        of alignment, from its MD tag """
+    if alignment.md is None:
+        raise ValueError("MD tag not present")
+    indices = []
+    aligned = 0
+    for matches, mismatch in MD.findall(alignment.md):
+        if matches:
+            aligned += int(matches)
+        elif mismatch:
+            indices.append(aligned)
+            aligned += 1
+    block_indices, block_positions = [], []
+    aligned, position = 0, alignment.reference_start
+    for operation, length in alignment.cigar:
+        if operation in ALIGNED_OPERATIONS:
+            block_indices.append(aligned)
+            block_positions.append(position)
+            aligned += length
+        if operation in REFERENCE_OPERATIONS:
+            position += length
+    indices = np.array(indices, dtype=np.int64)
+    blocks = np.searchsorted(block_indices, indices, side='right') - 1
+    return indices, np.array(block_positions, dtype=np.int64)[blocks] + indices - np.array(block_indices)[blocks]
+
+
+def read_alignments(sam_data: str or IO) -> Tuple[[int], [Alignment]]:
+    """ Reference lengths and alignments of SAM or BAM file """
+    if isinstance(sam_data, (str, bytes, os.PathLike)):
+        with open(sam_data, 'rb') as f:
+            if f.read(len(BAM_MAGIC)) == BAM_MAGIC:
+                return _read_bam(sam_data)
+            f.seek(0)
+            return _read_sam(f)
+    return _read_sam(sam_data)
+
+
+def _read_sam(lines: Iterable[str or bytes]) -> Tuple[[int], [Alignment]]:
+    reference_lengths, alignments = [], []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode()
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        if line.startswith('@'):
+            if line.startswith('@SQ'):
+                tags = dict(field.split(':', 1) for field in line.split('\t')[1:])
+                reference_lengths.append(int(tags['LN']))
+            continue
+        fields = line.split('\t')
+        md = next((field[5:] for field in fields[11:] if field.startswith('MD:Z:')), None)
+        alignments.append(Alignment(
+            flag=int(fields[1]),
+            reference_start=int(fields[3]) - 1,
+            cigar=[(operation, int(length)) for length, operation in CIGAR.findall(fields[5])],
+            query_length=len(fields[9]) if fields[9] != '*' else 0,
+            md=md,
+        ))
+    return reference_lengths, alignments
+
+
+def _read_bam(path: str) -> Tuple[[int], [Alignment]]:
+    import pysam
+    with pysam.AlignmentFile(path, 'rb') as bam:
+        alignments = [
+            Alignment(
+                flag=read.flag,
+                reference_start=read.reference_start,
+                cigar=[(CIGAR_OPERATIONS[operation], length) for operation, length in read.cigartuples or []],
+                query_length=read.query_length,
+                md=read.get_tag('MD') if read.has_tag('MD') else None,
+            )
+            for read in bam.fetch(until_eof=True)
+        ]
+        return list(bam.lengths), alignments
+
+
+def print_evaluation(result: EvaluationResult):
     print("Pokrycie referencji:", result.reference_coverage)
     print("Pokrycie odczytów:", result.reads_coverage)
     print("Błędy uliniowień:", result.alignment_errors)
@@ -114,3 +210,9 @@ if __name__ == '__main__':
     print("Liczba uliniowień:", result.number_of_alignments)
     print("Ocena rozdrobnienia:", result.fragmentation_score)
     print("Łączna ocena:", result.overall_score)
+
+
+if __name__ == '__main__':
+    import sys
+
+    print_evaluation(evaluate(sys.stdin))
@@ -1,14 +1,184 @@
+import gzip
 import textwrap
+from collections import namedtuple
+from itertools import chain, islice, zip_longest
+from typing import Iterator, Iterable, List, Sequence, Tuple
 
+import numpy as np
 
-def parse_input(input_file_name):
-    dane = []
-    with open(input_file_name) as f:
-        for line in f:
-            line = line.strip()
-            if line[0] != '>':
-                dane.append(line)
-    return dane
+from read_store import ReadStore
+
+CHUNK_SIZE = 1 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+# 'fr': second mate read from the other strand, towards first one, 'ff': both from the same strand
+ORIENTATIONS = ('fr', 'ff')
+COMPLEMENT = str.maketrans('ACGTacgt', 'TGCAtgca')
+
+Record = namedtuple('Record', ['name', 'sequence'])
+
+
+def open_input(input_file_name):
+    """ Open plain or gzipped file in binary mode """
+    with open(input_file_name, 'rb') as f:
+        magic = f.read(len(GZIP_MAGIC))
+    if magic == GZIP_MAGIC:
+        return gzip.open(input_file_name, 'rb')
+    return open(input_file_name, 'rb')
+
+
+def read_lines(input_file_name, chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+    """ Stream non-blank lines of file, reading it in chunks """
+    with open_input(input_file_name) as f:
+        rest = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (rest + chunk.replace(b'\r', b'')).split(b'\n')
+            rest = lines.pop()
+            yield from filter(None, lines)
+        if rest:
+            yield rest
+
+
+def read_records(input_file_name, chunk_size=CHUNK_SIZE) -> Iterator[Record]:
+    """ Stream records of FASTA (also multi-line), FASTQ or plain file
+        with one read per line. Format is detected from first line. """
+    lines = read_lines(input_file_name, chunk_size)
+    first_line = next(lines, None)
+    if first_line is None:
+        return
+    if first_line.startswith(b'>'):
+        yield from _fasta_records(first_line, lines)
+    elif first_line.startswith(b'@'):
+        yield from _fastq_records(first_line, lines)
+    else:
+        yield Record(None, first_line.decode())
+        for line in lines:
+            yield Record(None, line.decode())
+
+
+def _fasta_records(header: bytes, lines: Iterable[bytes]) -> Iterator[Record]:
+    parts = []
+    for line in lines:
+        if line.startswith(b'>'):
+            yield Record(header[1:].decode(), b''.join(parts).decode())
+            header, parts = line, []
+        else:
+            parts.append(line)
+    yield Record(header[1:].decode(), b''.join(parts).decode())
+
+
+def _fastq_records(header: bytes, lines: Iterable[bytes]) -> Iterator[Record]:
+    lines = iter(lines)
+    while header is not None:
+        parts = []
+        for line in lines:
+            if line.startswith(b'+'):
+                break
+            parts.append(line)
+        sequence = b''.join(parts)
+        quality_length = 0
+        while quality_length < len(sequence):
+            line = next(lines, b'')
+            if not line:
+                raise ValueError(f"Truncated FASTQ record {header.decode()}")
+            quality_length += len(line)
+        yield Record(header[1:].decode(), sequence.decode())
+        header = next(lines, None)
+
+
+def mate_name(name: str or None) -> str or None:
+    """ Name of read pair: first word of read name without /1 or /2 """
+    if name is None:
+        return None
+    words = name.split(maxsplit=1)
+    name = words[0] if words else ''
+    return name[:-2] if name[-2:] in ('/1', '/2') else name
+
+
+def reverse_complement(sequence: str) -> str:
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def _check_mates(first: Record, second: Record):
+    if first.name is not None and second.name is not None and mate_name(first.name) != mate_name(second.name):
+        raise ValueError(f"Reads {first.name} and {second.name} are not mates")
+
+
+def paired_records(first_file_name, second_file_name, chunk_size=CHUNK_SIZE) -> Iterator[Tuple[Record, Record]]:
+    """ Stream pairs of mates from two files of reads in the same order """
+    first_records = read_records(first_file_name, chunk_size)
+    second_records = read_records(second_file_name, chunk_size)
+    for first, second in zip_longest(first_records, second_records):
+        if first is None or second is None:
+            raise ValueError(f"Files {first_file_name} and {second_file_name} have different numbers of reads")
+        _check_mates(first, second)
+        yield first, second
+
+
+def interleaved_records(records: Iterable[Record]) -> Iterator[Tuple[Record, Record]]:
+    """ Pairs of consecutive records """
+    records = iter(records)
+    for first in records:
+        second = next(records, None)
+        if second is None:
+            raise ValueError(f"Read {first.name} has no mate")
+        _check_mates(first, second)
+        yield first, second
+
+
+def is_interleaved(records: Sequence[Record]) -> bool:
+    """ Whether first two records are different reads of the same pair,
+        which is the case of files with mates one after another """
+    if len(records) < 2 or records[0].name is None or records[1].name is None:
+        return False
+    return records[0].name != records[1].name and mate_name(records[0].name) == mate_name(records[1].name)
+
+
+def parse_input(input_file_name) -> ReadStore:
+    return ReadStore.from_records(read_records(input_file_name))
+
+
+def parse_inputs(input_file_names: Sequence[str], paired_file_names: Sequence[Tuple[str, str]] = (),
+                 orientation='fr', chunk_size=CHUNK_SIZE) -> Tuple[ReadStore, List[np.ndarray]]:
+    """ Reads of all libraries streamed into one store in a single pass,
+        and (first mate, second mate) read numbers of every paired library.
+
+        Input files with mates one after another are detected by read
+        names, pairs of files are read side by side. Second mates of 'fr'
+        libraries are reverse complemented, so that both mates of a pair
+        are read from the same strand, as all the reads are assembled. """
+    assert orientation in ORIENTATIONS
+    libraries = []
+    number_of_reads = 0
+
+    def records() -> Iterator[Record]:
+        nonlocal number_of_reads
+        for input_file_name in input_file_names:
+            file_records = read_records(input_file_name, chunk_size)
+            head = list(islice(file_records, 2))
+            if is_interleaved(head):
+                yield from mates(interleaved_records(chain(head, file_records)))
+                continue
+            for record in chain(head, file_records):
+                number_of_reads += 1
+                yield record
+        for first_file_name, second_file_name in paired_file_names:
+            yield from mates(paired_records(first_file_name, second_file_name, chunk_size))
+
+    def mates(pairs: Iterable[Tuple[Record, Record]]) -> Iterator[Record]:
+        nonlocal number_of_reads
+        first_mates = []
+        libraries.append(first_mates)
+        for first, second in pairs:
+            first_mates.append(number_of_reads)
+            number_of_reads += 2
+            yield first
+            yield Record(second.name, reverse_complement(second.sequence)) if orientation == 'fr' else second
+
+    reads = ReadStore.from_records(records())
+    return reads, [np.array(first_mates, dtype=np.int64)[:, np.newaxis] + [0, 1] for first_mates in libraries]
 
 
 def dump_output(output_file_name, data: str or []):
@@ -0,0 +1,45 @@
+import multiprocessing
+from typing import Callable, Iterator, Sequence, Tuple
+
+MAX_SHARDS = 100
+
+_shared = {}
+
+
+def shared(name: str):
+    """ Object shared with workers by `parallel_map` """
+    return _shared[name]
+
+
+def shards(total: int, workers: int = 1) -> [Tuple[int, int]]:
+    """ Split range(total) into consecutive (start, stop) ranges, at least
+        a few per worker so they are balanced and progress can be shown """
+    number_of_shards = max(1, min(total, max(MAX_SHARDS, 4 * workers)))
+    bounds = [total * i // number_of_shards for i in range(number_of_shards + 1)]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+def _install(objects: dict):
+    _shared.clear()
+    _shared.update(objects)
+
+
+def parallel_map(function: Callable, tasks: Sequence, workers: int = 1, **objects) -> Iterator:
+    """ Yield function(task) for every task, in order of tasks.
+
+        `objects` are made available to function through `shared`. Every
+        worker gets them once when it starts, instead of a pickled copy
+        with every task: forked workers inherit them, others (spawn start
+        method) unpickle them. With a single worker everything runs in
+        this process. Close the generator (`contextlib.closing`) when
+        results are not consumed to the end, so that workers and shared
+        objects are released right away. """
+    _install(objects)
+    try:
+        if workers <= 1:
+            yield from map(function, tasks)
+        else:
+            with multiprocessing.Pool(workers, _install, (objects,)) as pool:
+                yield from pool.imap(function, tasks)
+    finally:
+        _shared.clear()
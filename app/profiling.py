@@ -0,0 +1,98 @@
+import cProfile
+import json
+import os
+import resource
+from contextlib import contextmanager
+from time import perf_counter, process_time
+
+_active = []
+
+
+class Profiler:
+    """ Wall time, CPU time (finished worker processes included), memory
+        and counters of nested pipeline stages. Memory is peak RSS of the
+        process at the end of stage and how much the stage raised it.
+        Stages are recorded in order of their start, nested ones named
+        'parent/child'. With cprofile_dir, every top-level stage is also
+        profiled by cProfile into '<stage>.prof'. """
+
+    def __init__(self, cprofile_dir: str = None):
+        self.cprofile_dir = cprofile_dir
+        self.stages = []
+        self.counters = {}
+        self._open = []
+
+    @contextmanager
+    def stage(self, name: str):
+        name = '/'.join([self._open[-1]['name'], name]) if self._open else name
+        record = {'name': name, 'counters': {}}
+        self.stages.append(record)
+        self._open.append(record)
+        profile = cProfile.Profile() if self.cprofile_dir and len(self._open) == 1 else None
+        start_wall, start_cpu, start_peak = perf_counter(), _cpu_seconds(), _peak_rss()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.cprofile_dir, f'{name}.prof'))
+            peak = _peak_rss()
+            record.update({
+                'wall_seconds': perf_counter() - start_wall,
+                'cpu_seconds': _cpu_seconds() - start_cpu,
+                'peak_rss': peak,
+                'rss_increase': peak - start_peak,
+            })
+            self._open.pop()
+
+    def counter(self, name: str, value):
+        """ Set counter of innermost open stage and of the whole run """
+        if self._open:
+            self._open[-1]['counters'][name] = value
+        self.counters[name] = value
+
+    def report(self) -> dict:
+        return {'stages': self.stages, 'counters': self.counters, 'peak_rss': _peak_rss()}
+
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+@contextmanager
+def profiling(profiler: Profiler):
+    """ Make profiler record `stage` and `counter` calls of the pipeline """
+    _active.append(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.remove(profiler)
+
+
+@contextmanager
+def stage(name: str):
+    """ Stage of active profiler, nothing is recorded without one """
+    if not _active:
+        yield None
+        return
+    with _active[-1].stage(name) as record:
+        yield record
+
+
+def counter(name: str, value):
+    """ Counter of active profiler, ignored without one """
+    if _active:
+        _active[-1].counter(name, value)
+
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return process_time() + children.ru_utime + children.ru_stime
+
+
+def _peak_rss() -> int:
+    """ Peak resident memory of this process in bytes """
+    return 1024 * resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
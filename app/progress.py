@@ -0,0 +1,133 @@
+import logging
+import sys
+from collections import namedtuple
+from time import monotonic
+from typing import Optional
+
+PROGRESS_INTERVAL = 1.0
+# clock is read about this many times per interval, not on every iteration
+CHECKS_PER_INTERVAL = 10
+BAR_LENGTH = 50
+MODES = ('auto', 'bar', 'log', 'silent')
+
+ProgressState = namedtuple('ProgressState', ['description', 'iteration', 'total', 'elapsed', 'eta'])
+
+
+class TerminalReporter:
+    """ Bar with percent and ETA redrawn in place on stderr """
+
+    def __init__(self, stream=None):
+        self._stream = stream
+
+    @property
+    def stream(self):
+        """ Given stream or current stderr, which may be replaced later """
+        return self._stream or sys.stderr
+
+    def report(self, state: ProgressState):
+        filled = BAR_LENGTH * state.iteration // state.total if state.total else BAR_LENGTH
+        bar = '█' * filled + '-' * (BAR_LENGTH - filled)
+        self.stream.write(f'\r{state.description}: |{bar}| {_percent(state):5.1f}% ETA {_duration(state.eta)}')
+        self.stream.flush()
+
+    def finish(self, state: ProgressState):
+        self.stream.write(f'\r{state.description}: |{"█" * BAR_LENGTH}| 100.0% in {_duration(state.elapsed)}\n')
+        self.stream.flush()
+
+
+class LogReporter:
+    """ Progress as log records, with the state in `progress` attribute
+        of the record for structured log handlers """
+
+    def __init__(self, logger: logging.Logger = None):
+        self.logger = logger or logging.getLogger('progress')
+
+    def report(self, state: ProgressState):
+        self.logger.info(f"{state.description}: {_percent(state):.1f}% ({state.iteration}/{state.total}), "
+                         f"ETA {_duration(state.eta)}", extra={'progress': state._asdict()})
+
+    def finish(self, state: ProgressState):
+        self.logger.info(f"{state.description}: done in {_duration(state.elapsed)}",
+                         extra={'progress': state._asdict()})
+
+
+class Progress:
+    """ Progress of a loop of total iterations, reported at most once per
+        interval. `update` only compares iteration with the next one worth
+        reading the clock at, so it costs next to nothing in hot loops, and
+        nothing else happens without a reporter. """
+
+    def __init__(self, total: int, description: str, reporter=None, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.description = description
+        self.reporter = reporter
+        self.interval = interval
+        self.start = monotonic()
+        self._next_report = self.start + interval
+        self._next_iteration = 1 if reporter is not None else float('inf')
+        self._reported = False
+
+    def update(self, iteration: int):
+        if iteration >= self._next_iteration:
+            self._check(iteration)
+
+    def _check(self, iteration: int):
+        now = monotonic()
+        elapsed = now - self.start
+        if now >= self._next_report:
+            self.reporter.report(self._state(iteration, elapsed))
+            self._reported = True
+            self._next_report = now + self.interval
+        rate = iteration / elapsed if elapsed > 0 else 0
+        self._next_iteration = iteration + max(1, int(rate * self.interval / CHECKS_PER_INTERVAL))
+
+    def _state(self, iteration: int, elapsed: float) -> ProgressState:
+        eta = elapsed * (self.total - iteration) / iteration if iteration else None
+        return ProgressState(self.description, iteration, self.total, elapsed, eta)
+
+    def finish(self):
+        """ Report end of loop, if progress of it was reported at all """
+        if self._reported:
+            self.reporter.finish(self._state(self.total, monotonic() - self.start))
+            self._reported = False
+
+    def __enter__(self) -> 'Progress':
+        return self
+
+    def __exit__(self, *exception):
+        self.finish()
+
+
+def _percent(state: ProgressState) -> float:
+    return 100 * state.iteration / state.total if state.total else 100.0
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02}:{seconds:02}' if hours else f'{minutes:02}:{seconds:02}'
+
+
+_reporter = None
+_interval = PROGRESS_INTERVAL
+
+
+def configure(mode: str = 'auto', interval: float = PROGRESS_INTERVAL, stream=None):
+    """ Report progress as bar, as log records or not at all. In auto mode
+        it is bar on terminal and log records otherwise. """
+    global _reporter, _interval
+    assert mode in MODES
+    if mode == 'auto':
+        mode = 'bar' if (stream or sys.stderr).isatty() else 'log'
+    _reporter = {'bar': TerminalReporter(stream), 'log': LogReporter(), 'silent': None}[mode]
+    _interval = interval
+
+
+def track(total: int, description: str) -> Progress:
+    """ Progress of loop reported as configured """
+    return Progress(total, description, _reporter, _interval)
+
+
+configure()
@@ -0,0 +1,107 @@
+from collections.abc import Sequence
+from itertools import islice
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+# records joined into the buffer at once
+BATCH_SIZE = 1 << 14
+
+ENCODING = np.full(256, 255, dtype=np.uint8)
+for code, base in enumerate(b'ACGT'):
+    ENCODING[base] = code
+    ENCODING[base + ord('a') - ord('A')] = code
+
+
+def frozen_buffer(buffer: bytearray) -> np.ndarray:
+    """ Read-only array over bytearray, without copying it """
+    array = np.frombuffer(buffer, dtype=np.uint8)
+    array.flags.writeable = False
+    return array
+
+
+class ReadStore(Sequence):
+    """ All reads kept in one contiguous uint8 buffer with an offsets
+        array, read `i` is `buffer[offsets[i]:offsets[i + 1]]`.
+        Behaves like a sequence of strings, use `view` for zero-copy
+        access to the bytes of a read. Read names are optional. """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray, names: [str] = None):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.names = names
+
+    @classmethod
+    def from_reads(cls, reads: Iterable[str]) -> 'ReadStore':
+        if isinstance(reads, ReadStore):
+            return reads
+        return cls.from_records((None, read) for read in reads)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str]], batch_size=BATCH_SIZE) -> 'ReadStore':
+        """ Build store from (name, sequence) pairs consumed lazily in
+            batches, names are kept unless all of them are None """
+        records = iter(records)
+        buffer = bytearray()
+        lengths = []
+        names = []
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            batch_names, sequences = zip(*batch)
+            sequences = [sequence.encode() for sequence in sequences]
+            buffer += b''.join(sequences)
+            lengths.extend(map(len, sequences))
+            names.extend(batch_names)
+        if not any(name is not None for name in names):
+            names = None
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(frozen_buffer(buffer), offsets, names)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item: int or slice) -> str or 'ReadStore':
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                return ReadStore.from_records((self.name(i), self[i]) for i in range(start, stop, step))
+            names = self.names[item] if self.names is not None else None
+            offsets = self.offsets[start:stop + 1] if stop > start else self.offsets[start:start + 1]
+            return ReadStore(self.buffer, offsets, names)
+        return self.view(item).tobytes().decode()
+
+    def __iter__(self) -> Iterator[str]:
+        data = memoryview(self.buffer)
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            yield bytes(data[start:end]).decode()
+
+    def view(self, item: int) -> np.ndarray:
+        """ Zero-copy view of bytes of read """
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('read index out of range')
+        return self.buffer[self.offsets[item]:self.offsets[item + 1]]
+
+    def name(self, item: int) -> str or None:
+        return self.names[item] if self.names is not None else None
+
+    def encoded(self, item: int) -> np.ndarray:
+        """ Read as 2-bit codes (A=0, C=1, G=2, T=3), other symbols are 255 """
+        return ENCODING[self.view(item)]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def alphabet(self) -> set:
+        data = self.buffer[self.offsets[0]:self.offsets[-1]]
+        return {chr(symbol) for symbol in np.unique(data)}
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes + self.offsets.nbytes
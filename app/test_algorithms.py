@@ -1,5 +1,5 @@
+import io
 import tempfile
-from contextlib import contextmanager
 
 import pytest
 import sh
@@ -9,18 +9,6 @@ from assembly_sample import SAMPLE_FILES
 from evaluate import evaluate
 
 
-@contextmanager
-def pysam_sucks(bowtie_output: sh.RunningCommand):
-    """
-       At this moment, pysam is stupid and DOES NOT SUPPORT StringIO,
-       so we must dump result to file
-    """
-    with tempfile.NamedTemporaryFile(suffix='.fasta') as file:
-        file.write(bowtie_output.stdout)
-        file.seek(0)
-        yield file
-
-
 def test_reference():
     indexed_result = sh.bowtie2(
         "-a",
@@ -32,8 +20,7 @@ def test_reference():
         "-x ./sample_data/reference/reference",
         "-U ./sample_data/reference/reference.fasta",
     )
-    with pysam_sucks(indexed_result) as file:
-        evaluation_results = evaluate(file)
+    evaluation_results = evaluate(io.BytesIO(indexed_result.stdout))
     assert evaluation_results.overall_score == 1
 
 
@@ -56,7 +43,6 @@ def test_sample_data(file):
             "-x ./sample_data/reference/reference",
             f"-U {tmp_file.name}",
         )
-        with pysam_sucks(indexed_result) as file:
-            evaluation_results = evaluate(file)
+        evaluation_results = evaluate(io.BytesIO(indexed_result.stdout))
         print(evaluation_results)
         assert evaluation_results.overall_score >= 0.01
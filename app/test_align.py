@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from align import COMPLEMENT, ReferenceIndex, align_contig, evaluate_contigs
+from evaluate import REVERSE, UNMAPPED
+
+
+@pytest.fixture
+def index(reference):
+    return ReferenceIndex([reference])
+
+
+def substituted(sequence, position):
+    return sequence[:position] + ('A' if sequence[position] != 'A' else 'C') + sequence[position + 1:]
+
+
+def test_hits(reference, index):
+    query_positions, reference_positions = index.hits(reference[100:130])
+    assert query_positions.tolist() == list(range(16))
+    assert reference_positions.tolist() == list(range(100, 116))
+
+
+def test_align_exact_and_reverse(reference, index):
+    contig = reference[500:1500]
+    alignment = align_contig(contig, index)
+    assert alignment.flag == 0 and alignment.reference_start == 500
+    assert alignment.cigar == [('M', 1000)] and alignment.md == '1000'
+    reverse = align_contig(contig.translate(COMPLEMENT)[::-1], index)
+    assert reverse.flag == REVERSE and reverse.reference_start == 500 and reverse.cigar == [('M', 1000)]
+
+
+def test_align_errors(reference, index):
+    contig = substituted(reference[500:1000], 200)
+    inserted = 2 * next(base for base in 'ACGT' if base not in reference[899:901])
+    contig = contig[:300] + contig[305:400] + inserted + contig[400:]
+    alignment = align_contig(contig, index)
+    assert alignment.reference_start == 500
+    assert alignment.cigar == [('M', 300), ('D', 5), ('M', 95), ('I', 2), ('M', 100)]
+    assert alignment.md == f'200{reference[700]}99^{reference[800:805]}195'
+
+
+def test_align_clipped_and_unmapped(reference, index):
+    rng = random.Random(1)
+    junk = ''.join(rng.choice('ACGT') for _ in range(199))
+    junk += next(base for base in 'ACGT' if base != reference[999])
+    alignment = align_contig(junk + reference[1000:1600], index)
+    assert alignment.reference_start == 1000 and alignment.cigar == [('S', 200), ('M', 600)]
+    assert align_contig(junk, index).flag == UNMAPPED
+
+
+def test_evaluate_contigs(reference):
+    assert evaluate_contigs([reference], [reference]).overall_score == 1
+    result = evaluate_contigs([reference[:1400], reference[1300:]], [reference])
+    assert result.number_of_alignments == 2 and result.reference_coverage == (len(reference) - 100) / len(reference)
@@ -0,0 +1,49 @@
+import os
+
+import bench.benchmark
+from bench.benchmark import benchmark, compare, over_budget, run_benchmark, BenchmarkResult
+from bench.simulate import simulate_reads
+from utils import n50
+
+
+def test_simulate_reads():
+    reference, reads = simulate_reads(reference_length=2000, coverage=10, read_length=50, error_rate=0.02, seed=1)
+    assert len(reference) == 2000 and set(reference) == set('ACGT')
+    assert len(reads) == 400 and all(len(read) == 50 for read in reads)
+    assert simulate_reads(reference_length=2000, coverage=10, read_length=50, error_rate=0.02, seed=1).reads == reads
+    exact = sum(read in reference for read in reads)
+    assert 0.2 < exact / len(reads) < 0.6  # 0.98 ** 50 of reads have no errors
+    _, clean_reads = simulate_reads(reference_length=2000, coverage=10, read_length=50, error_rate=0, seed=1)
+    assert all(read in reference for read in clean_reads)
+
+
+def test_n50():
+    assert n50([]) == 0
+    assert n50([10]) == 10
+    assert n50([2, 3, 4, 5, 6, 7, 8, 9, 10]) == 8
+    assert n50([1, 1, 10]) == 10
+
+
+def test_benchmark(capsys):
+    parameters = {'reference_length': 1000, 'coverage': 10, 'read_length': 50, 'error_rate': 0, 'seed': 0}
+    report = benchmark(parameters, ['GREEDY_SCS'])
+    assert report['parameters']['reads'] == 200
+    assert [(result['algorithm'], result['error_correction']) for result in report['results']] == [
+        ('GREEDY_SCS', False), ('GREEDY_SCS', True),
+    ]
+    result = BenchmarkResult(**report['results'][0])
+    assert result.error is None and result.contigs == 1 and result.n50 >= 1000 and result.peak_rss > 0
+    assert 0 <= result.score <= 1
+    assert not over_budget(result)
+    compare(report, report)
+    assert 'time x1.00' in capsys.readouterr().out
+
+
+def _crash(sender, *arguments):
+    os._exit(3)
+
+
+def test_crashed_run(monkeypatch):
+    monkeypatch.setattr(bench.benchmark, '_measure', _crash)
+    result = run_benchmark('reads.fasta', 'reference.fasta', 'OLC', False)
+    assert result.error == 'exit code 3' and over_budget(result)
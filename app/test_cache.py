@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from algorithms.error_corrections import CorrectedReads
+from algorithms.olc import layout, overlap_naive, overlap_suffix
+from cache import Cache, cache_key, reads_digest
+from read_store import ReadStore
+
+
+def test_fetch_computes_once(tmpdir):
+    cache = Cache(str(tmpdir))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'a': np.arange(5), 'b': np.array([1.5])}
+    first, second = cache.fetch('key', compute), cache.fetch('key', compute)
+    assert len(calls) == 1
+    assert np.array_equal(first['a'], second['a']) and second['b'][0] == 1.5
+
+
+def test_eviction_of_least_recently_used(tmpdir):
+    cache = Cache(str(tmpdir))
+    for key in 'abc':
+        cache.put(key, data=np.zeros(100))
+        os.utime(cache.path(key), (0, 'abc'.index(key)))
+    cache.max_bytes = cache.nbytes
+    cache.get('a')
+    cache.put('d', data=np.zeros(100))
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd') and cache.nbytes <= cache.max_bytes
+
+
+def test_broken_file_is_a_miss(tmpdir):
+    cache = Cache(str(tmpdir))
+    with open(cache.path('key'), 'wb') as f:
+        f.write(b'not a zip')
+    assert cache.get('key') is None and not os.path.exists(cache.path('key'))
+
+
+def test_reads_digest(reads):
+    store = ReadStore.from_reads(reads)
+    assert reads_digest(reads) == reads_digest(store)
+    assert reads_digest(store[2:]) == reads_digest(reads[2:])
+    assert reads_digest(store[1:]) != reads_digest(store)
+    assert reads_digest(['AC', 'GT']) != reads_digest(['ACG', 'T'])
+    assert cache_key('stage', 1) != cache_key('stage', 2)
+
+
+def test_cached_correction(tmpdir, reads):
+    noisy = [read[:30] + 'A' + read[31:] if number == 3 else read for number, read in enumerate(reads)]
+    expected = list(CorrectedReads(noisy, k=8, threshold=1))
+    cache = Cache(str(tmpdir))
+    assert list(CorrectedReads(noisy, k=8, threshold=1, cache=cache)) == expected
+    corrected = CorrectedReads(noisy, k=8, threshold=1, cache=cache)
+    corrected._correct_reads = None  # must not be called
+    assert list(corrected) == expected
+    assert corrected.statistics == CorrectedReads(noisy, k=8, threshold=1).statistics
+    assert len(os.listdir(str(tmpdir))) == 2
+
+
+def test_cached_overlaps(tmpdir, reads):
+    cache = Cache(str(tmpdir))
+    expected = layout(overlap_naive(reads))
+    assert layout(overlap_naive(reads, cache=cache)) == expected
+    assert layout(overlap_naive(reads, cache=cache)) == expected
+    assert layout(overlap_suffix(reads, cache=cache)) == expected
+    assert len(os.listdir(str(tmpdir))) == 2
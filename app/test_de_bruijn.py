@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from algorithms.de_bruijn import DeBruijnGraph, do_assembly
+from algorithms.error_corrections import CorrectedReads
+from algorithms.kmers import encode
+from algorithms.packed_de_bruijn import PackedDeBruijnGraph
+
+
+def test_super_string():
+    graph = DeBruijnGraph(["konstantynopoli", "politanczykowianeczka"], 5)
+    assert graph.super_string == 'konstantynopolitanczykowianeczka'
+
+
+@pytest.mark.parametrize('graph_type', [DeBruijnGraph, PackedDeBruijnGraph])
+def test_eulerian_path_does_not_recurse(reference, graph_type):
+    graph = graph_type([reference], 15)
+    assert graph.super_string == reference
+    assert graph.unitigs() == [reference]
+
+
+def test_eulerian_cycle():
+    graph = DeBruijnGraph(['ACGTTGCAACG'], 4)
+    assert graph.has_eulerian_cycle()
+    assert graph.super_string == 'ACGTTGCAAC'
+    assert graph.unitigs() == ['ACGTTGCAACG']
+
+
+def test_unitigs_of_reads(reference):
+    reads = [reference[start:start + 100] for start in range(0, len(reference) - 99, 10)]
+    error = 'A' if reference[1050] != 'A' else 'C'
+    reads.append(reference[1000:1050] + error + reference[1051:1100])
+    graph = DeBruijnGraph(reads, 15)
+    assert not graph.is_eulerian()
+    unitigs = graph.contigs()
+    # bubble made by error splits reference into two unitigs plus two branches
+    assert len(unitigs) == 4
+    assert [unitig in reference for unitig in unitigs].count(False) == 1
+    first, *rest = sorted((unitig for unitig in unitigs if unitig in reference), key=reference.find)
+    assert first + ''.join(unitig[14:] for unitig in rest) == reference
+
+
+def test_packed_graph_same_as_dict_graph(reference):
+    rng = random.Random(1)
+    reads = [
+        ''.join(c if rng.random() > 0.01 else rng.choice('ACGT') for c in reference[start:start + 100])
+        for start in range(0, len(reference) - 99, 5)
+    ]
+    graph, packed = DeBruijnGraph(reads, 15), PackedDeBruijnGraph(reads, 15)
+    assert (packed.nodes_balanced, packed.nodes_semi_balanced, packed.nodes_not_balanced) == (
+        graph.nodes_balanced, graph.nodes_semi_balanced, graph.nodes_not_balanced)
+    assert sorted(packed.unitigs()) == sorted(graph.unitigs())
+    assert sorted(do_assembly(reads, graph_type=PackedDeBruijnGraph)) == sorted(do_assembly(reads))
+
+
+def test_packed_graph_successors():
+    graph = PackedDeBruijnGraph(['ACGTA', 'ACGTC', 'ACGTC'], 4)
+    node = int(np.searchsorted(graph.nodes, encode('CGT')))
+    assert graph.out_masks[node] == 0b0011
+    assert [graph._label(following) for following in graph.graph[node]] == ['GTA', 'GTC', 'GTC']
+    assert graph.out_degree[node] == 3 and graph.in_degree[node] == 3
+
+
+def test_assembly_with_chosen_k(reference):
+    rng = random.Random(2)
+    reads = [
+        ''.join(c if rng.random() > 0.01 else rng.choice('ACGT') for c in reference[start:start + 100])
+        for start in range(0, len(reference) - 99, 5)
+    ]
+    contigs = do_assembly(CorrectedReads(reads), graph_type=PackedDeBruijnGraph, k=None)
+    assert max(map(len, contigs)) > max(map(len, do_assembly(CorrectedReads(reads))))
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from algorithms.error_corrections import CorrectedReads
+
+
+@pytest.fixture
+def reads(reference):
+    reads = [reference[start:start + 50] for start in range(0, 150, 2)]
+    reads[10] = reads[10][:30] + ('A' if reads[10][30] != 'A' else 'C') + reads[10][31:]
+    reads[20] = reads[20][:5] + 'N' + reads[20][6:]
+    return reads
+
+
+def test_corrects_single_errors(reference, reads):
+    corrected = CorrectedReads(reads, k=8, threshold=1)
+    assert list(corrected) == [reference[start:start + 50] for start in range(0, 150, 2)]
+    assert corrected.statistics == (len(reads), 2, 2)
+    assert corrected.corrections[10] == corrected.corrections[20] == 1
+
+
+def test_corrected_reads_same_as_correct1mm(reads):
+    rng = random.Random(1)
+    noisy = [''.join(c if rng.random() > 0.05 else rng.choice('ACGT') for c in read) for read in reads]
+    corrected = CorrectedReads(noisy, k=8, threshold=1)
+    assert list(corrected) == [corrected.correct1mm(read) for read in noisy]
+    assert list(corrected) == list(CorrectedReads(noisy, k=8, threshold=1))
+
+
+def test_canonical_correction(reference, reads):
+    complement = str.maketrans('ACGT', 'TGCA')
+    reads = reads + [read.translate(complement)[::-1] for read in reads[:8]]
+    corrected = CorrectedReads(reads, k=8, threshold=1, canonical=True)
+    assert list(corrected)[10] == reference[20:70]
@@ -0,0 +1,35 @@
+import io
+from math import log
+
+from evaluate import evaluate, redundant_regions
+
+SAM = '\n'.join([
+    '@HD\tVN:1.0',
+    '@SQ\tSN:reference\tLN:1000',
+    'a\t0\treference\t1\t42\t400M\t*\t0\t0\t*\t*\tMD:Z:10A339C49',
+    'b\t0\treference\t301\t42\t400M\t*\t0\t0\t*\t*\tMD:Z:400',
+    'c\t0\treference\t601\t42\t20S200M5I200M\t*\t0\t0\t*\t*\tMD:Z:0G399',
+    'd\t256\treference\t1\t1\t100M\t*\t0\t0\t*\t*\tMD:Z:100',
+    'e\t4\t*\t0\t0\t*\t*\t0\t0\t' + 'A' * 50 + '\t*',
+]) + '\n'
+
+
+def test_redundant_regions():
+    assert redundant_regions([]) == []
+    assert redundant_regions([(0, 400), (300, 700), (600, 1000)]) == [(300, 400), (600, 700)]
+    assert redundant_regions([(0, 10), (0, 5), (5, 10), (20, 30)]) == [(0, 10)]
+    assert redundant_regions([(0, 10), (10, 20)]) == []
+
+
+def test_evaluate(tmpdir):
+    path = str(tmpdir.join('contigs.sam'))
+    with open(path, 'w') as f:
+        f.write(SAM)
+    result = evaluate(path)
+    # unique parts are 0:300 of a with one mismatch and 700:1000 of c
+    assert result.number_of_alignments == 2
+    assert result.reference_coverage == 0.6
+    assert result.reads_coverage == 600 / (400 + 400 + 425 + 50)
+    assert result.alignment_errors == 1 / 600
+    assert result.fragmentation_score == 1 / log(6, 5)
+    assert evaluate(io.StringIO(SAM)) == result == evaluate(io.BytesIO(SAM.encode()))
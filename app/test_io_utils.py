@@ -0,0 +1,88 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from io_utils import mate_name, parse_input, parse_inputs, read_records, Record
+
+FASTA = b'>read_1 first\nACGT\nTTGA\n\n>read_2\r\nGGCC\r\n'
+FASTQ = b'@read_1\nACGTTTGA\n+\n@@@@\nIIII\n@read_2\nGGCC\n+read_2\nIIII\n'
+EXPECTED = [Record('read_1', 'ACGTTTGA'), Record('read_2', 'GGCC')]
+
+
+@pytest.fixture
+def write(tmpdir):
+    def _write(name, content, compress=False):
+        path = str(tmpdir.join(name))
+        with (gzip.open if compress else open)(path, 'wb') as f:
+            f.write(content)
+        return path
+    return _write
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1 << 20])
+def test_fasta(write, chunk_size):
+    records = list(read_records(write('reads.fasta', FASTA), chunk_size))
+    assert records == [Record('read_1 first', 'ACGTTTGA'), Record('read_2', 'GGCC')]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1 << 20])
+def test_fastq(write, chunk_size):
+    assert list(read_records(write('reads.fastq', FASTQ), chunk_size)) == EXPECTED
+
+
+def test_truncated_fastq(write):
+    with pytest.raises(ValueError):
+        list(read_records(write('reads.fastq', FASTQ[:-5])))
+
+
+def test_gzip(write):
+    assert list(read_records(write('reads.fastq.gz', FASTQ, compress=True))) == EXPECTED
+
+
+def test_plain_and_empty(write):
+    assert list(read_records(write('reads.txt', b'ACGT\n\nGGCC'))) == [Record(None, 'ACGT'), Record(None, 'GGCC')]
+    assert list(read_records(write('empty.fasta', b''))) == []
+
+
+def test_parse_input(write):
+    reads = parse_input(write('reads.fasta', FASTA))
+    assert list(reads) == ['ACGTTTGA', 'GGCC']
+    assert reads.names == ['read_1 first', 'read_2']
+    assert reads[1:].names == ['read_2']
+
+
+PAIRED_1 = b'>pair_1/1\nACGT\n>pair_2/1\nGGGA\n'
+PAIRED_2 = b'>pair_1/2\nTTAC\n>pair_2/2\nCATT\n'
+INTERLEAVED = b'@pair_1 1:N:0\nACGT\n+\nIIII\n@pair_1 2:N:0\nTTAC\n+\nIIII\n'
+
+
+def test_mate_name():
+    assert mate_name('pair_1/1') == mate_name('pair_1/2') == mate_name('pair_1 2:N:0:1') == 'pair_1'
+    assert mate_name(None) is None
+
+
+def test_parse_inputs(write):
+    reads, pairs = parse_inputs(
+        [write('single.fasta', FASTA), write('interleaved.fastq', INTERLEAVED)],
+        [(write('reads_1.fasta', PAIRED_1), write('reads_2.fasta', PAIRED_2))],
+        chunk_size=3,
+    )
+    assert list(reads) == ['ACGTTTGA', 'GGCC', 'ACGT', 'GTAA', 'ACGT', 'GTAA', 'GGGA', 'AATG']
+    assert reads.names[2:4] == ['pair_1 1:N:0', 'pair_1 2:N:0']
+    assert [library.tolist() for library in pairs] == [[[2, 3]], [[4, 5], [6, 7]]]
+
+
+def test_parse_inputs_same_strand(write):
+    reads, pairs = parse_inputs([write('interleaved.fastq', INTERLEAVED)], orientation='ff')
+    assert list(reads) == ['ACGT', 'TTAC'] and pairs[0].tolist() == [[0, 1]]
+    reads, pairs = parse_inputs([write('single.fasta', FASTA)])
+    assert len(reads) == 2 and pairs == []
+    reads, pairs = parse_inputs([])
+    assert len(reads) == 0 and reads.lengths.dtype == np.int64
+
+
+@pytest.mark.parametrize('second', [PAIRED_2[:-10], PAIRED_2.replace(b'pair_2', b'pair_3')])
+def test_parse_inputs_not_mates(write, second):
+    with pytest.raises(ValueError):
+        parse_inputs([], [(write('reads_1.fasta', PAIRED_1), write('reads_2.fasta', second))])
@@ -0,0 +1,94 @@
+import pickle
+import random
+
+import pytest
+
+from algorithms.kmers import KmerHistogram, choose_k, decode, encode, kmer_spectra, reverse_complement
+from read_store import ReadStore
+
+
+def naive_histogram(reads, k):
+    histogram = {}
+    for read in reads:
+        for i in range(len(read) - (k - 1)):
+            kmer = read[i:i + k]
+            if set(kmer) <= set('ACGT'):
+                histogram[kmer] = histogram.get(kmer, 0) + 1
+    return histogram
+
+
+@pytest.fixture
+def reads():
+    rng = random.Random(0)
+    return [''.join(rng.choice('ACGTN' if n % 5 == 0 else 'ACGT') for _ in range(rng.randrange(0, 40)))
+            for n in range(200)]
+
+
+@pytest.mark.parametrize('k', [1, 5, 11, 32])
+def test_histogram(reads, k):
+    histogram = KmerHistogram(ReadStore.from_reads(reads), k, chunk_bases=100)
+    assert dict(histogram) == naive_histogram(reads, k)
+    assert histogram.get('N' * k, 0) == 0
+
+
+def test_histogram_count(reads):
+    histogram = KmerHistogram(reads, 5)
+    naive = naive_histogram(reads, 5)
+    copy = pickle.loads(pickle.dumps(histogram))
+    for packed in range(4 ** 5):
+        assert histogram.count(packed) == copy.count(packed) == naive.get(decode(packed, 5), 0)
+
+
+def test_canonical_histogram(reads):
+    histogram = KmerHistogram(reads, 7, canonical=True)
+    naive = naive_histogram(reads, 7)
+    complement = str.maketrans('ACGT', 'TGCA')
+    for kmer, count in naive.items():
+        reverse = kmer.translate(complement)[::-1]
+        expected = count + naive.get(reverse, 0) if reverse != kmer else count
+        assert histogram[kmer] == histogram[reverse] == expected
+
+
+def test_packing():
+    assert encode('ACGT') == 0b00011011
+    assert encode('ACNT') is None
+    assert decode(encode('AACGTT'), 6) == 'AACGTT'
+    assert decode(reverse_complement(encode('AACGTC'), 6), 6) == 'GACGTT'
+
+
+@pytest.fixture
+def noisy_reads():
+    rng = random.Random(1)
+    reference = ''.join(rng.choice('ACGT') for _ in range(3000))
+    reads = []
+    for _ in range(900):
+        start = rng.randrange(len(reference) - 80)
+        reads.append(''.join(c if rng.random() > 0.01 else rng.choice('ACGT') for c in reference[start:start + 80]))
+    return reads
+
+
+def test_kmer_spectra(noisy_reads):
+    spectra = kmer_spectra(noisy_reads, [5, 15, 21])
+    for spectrum in spectra:
+        counts = naive_histogram(noisy_reads, spectrum.k).values()
+        frequencies = [list(counts).count(count) for count in range(max(counts) + 1)]
+        assert frequencies[spectrum.threshold] < frequencies[spectrum.threshold + 1]
+        assert all(a >= b for a, b in zip(frequencies[1:spectrum.threshold], frequencies[2:]))
+        assert spectrum.solid_kmers == sum(count > spectrum.threshold for count in counts)
+    # short k-mers repeat in reference, long ones are more often hit by errors
+    assert spectra[0].solid_kmers < spectra[1].solid_kmers
+
+
+def test_kmer_spectra_of_short_tail():
+    # k-mers of the last read are counted for every k, although it is shorter than the longest k
+    spectra = kmer_spectra(['ACGTACGTACGTACGT', 'ACGTAC'], [3, 10])
+    assert [spectrum.k for spectrum in spectra] == [3, 10]
+    assert spectra == [kmer_spectra(['ACGTACGTACGTACGT', 'ACGTAC'], [k])[0] for k in (3, 10)]
+    assert spectra[0].solid_kmers == 4
+
+
+def test_choose_k(noisy_reads):
+    spectrum = choose_k(noisy_reads)
+    assert 11 < spectrum.k < 32 and spectrum.threshold > 1
+    sampled = choose_k(noisy_reads, sample_bases=len(noisy_reads) * 40)
+    assert sampled == kmer_spectra(noisy_reads, [sampled.k])[0]
@@ -0,0 +1,248 @@
+import random
+
+import numpy as np
+import pytest
+
+from algorithms.compact_graph import CompactGraph
+from algorithms.olc import (
+    Contig, Graph, NodeQueue, consensus, overlap_naive, overlap_dynamic, overlap_suffix, layout, layout_contigs,
+    naive_graph_path, naive_graph_path_staring_from_node, olc_naive, _check_overlaps_dynamic,
+)
+from algorithms.scs import overlap
+from algorithms.seeds import SeedIndex
+from algorithms.suffix_array import GeneralizedSuffixArray, suffix_array
+
+
+def edges(graph):
+    ids = {node.id: number for number, node in enumerate(graph)}
+    return {(ids[node.id], ids[out_id], weight) for node in graph for out_id, weight in node.out.items()}
+
+
+def test_seed_index_candidates(reads):
+    seeds = SeedIndex(reads, 11)
+    assert seeds.reads_containing(reads[3][-11:]) == [3, 4, 5, 6]
+    assert seeds.overlap_candidates(reads[3], 6) == [3, 4, 5, 6]
+
+
+def test_seed_index_minimizers(reads):
+    seeds = SeedIndex(reads, 11, window=4)
+    assert 4 in seeds.overlap_candidates(reads[3], 6)
+
+
+def test_overlap_naive_consecutive_reads(reads):
+    graph = overlap_naive(reads)
+    found = edges(graph)
+    for number in range(len(reads) - 1):
+        assert (number, number + 1, 45) in found
+
+
+def test_overlap_dynamic_consecutive_reads(reads):
+    graph = overlap_dynamic(reads)
+    found = edges(graph)
+    for number in range(len(reads) - 1):
+        assert (number, number + 1, 45) in found
+
+
+@pytest.mark.parametrize('overlap', [6, 10, 13])
+def test_overlap_dynamic_short_overlap(reads, overlap):
+    short = [reads[0], reads[0][-overlap:] + reads[20]]
+    assert edges(overlap_naive(short)) == {(0, 1, overlap)}
+    assert (0, 1, overlap) in edges(overlap_dynamic(short))
+
+
+def test_suffix_array():
+    text = [ord(c) for c in 'mississippi']
+    assert suffix_array(text) == sorted(range(len(text)), key=lambda i: text[i:])
+
+
+def test_suffix_prefix_overlaps():
+    rng = random.Random(1)
+    reference = ''.join(rng.choice('ACG') for _ in range(300))
+    reads = [reference[start:start + rng.randrange(5, 40)] for start in range(0, 280, 7)]
+    expected = {}
+    for number_a, read_a in enumerate(reads):
+        for number_b, read_b in enumerate(reads):
+            length = overlap(read_a, read_b, min_length=6)
+            if number_a != number_b and length:
+                expected[number_a, number_b] = length
+    assert GeneralizedSuffixArray(reads).suffix_prefix_overlaps(6) == expected
+
+
+def test_overlap_suffix_consecutive_reads(reads):
+    graph = overlap_suffix(reads)
+    found = edges(graph)
+    for number in range(len(reads) - 1):
+        assert (number, number + 1, 45) in found
+
+
+def full_table_overlap(read_x, read_y, minimal_overlap):
+    costs = {frozenset('AG'): 2, frozenset('TC'): 2}
+    previous = [0] + [float('inf')] * len(read_y)
+    for char_x in read_x:
+        row = [0]
+        for j, char_y in enumerate(read_y, 1):
+            cost = 0 if char_x == char_y else costs.get(frozenset((char_x, char_y)), 4)
+            row.append(min(previous[j] + 8, row[j - 1] + 8, previous[j - 1] + cost))
+        previous = row
+    score = min(previous[minimal_overlap:])
+    overlap = previous[minimal_overlap:].index(score) + minimal_overlap
+    if overlap * 0.4 >= score:
+        return overlap
+
+
+def test_check_overlaps_dynamic_same_as_full_table():
+    rng = random.Random(2)
+    read_x = ''.join(rng.choice('ACGT') for _ in range(50))
+    reads_y = []
+    for shift in range(0, 50, 3):
+        read_y = list(read_x[shift:] + ''.join(rng.choice('ACGT') for _ in range(shift)))
+        for _ in range(rng.randrange(4)):
+            read_y[rng.randrange(50)] = rng.choice('ACGT')
+        reads_y.append(''.join(read_y))
+    expected = [full_table_overlap(read_x, read_y, 6) for read_y in reads_y]
+    assert _check_overlaps_dynamic(read_x, reads_y, 6) == expected
+    assert any(expected)
+
+
+@pytest.fixture
+def noisy_reads():
+    rng = random.Random(3)
+    reference = ''.join(rng.choice('ACGT') for _ in range(2000))
+    reads = []
+    for _ in range(150):
+        start = rng.randrange(len(reference) - 60)
+        reads.append(''.join(c if rng.random() > 0.01 else rng.choice('ACGT') for c in reference[start:start + 60]))
+    return reads
+
+
+def test_compact_graph_api(reads):
+    graph = CompactGraph.from_edges(reads[:3], [(0, 1, 45), (0, 2, 30), (1, 2, 45)])
+    assert len(graph) == 3 and graph[0].out.items() == [(1, 45), (2, 30)]
+    assert graph[2].entries.items() == [(0, 30), (1, 45)]
+    assert graph[0].get_next_node_id_and_overlap() == (1, 45)
+    assert graph.get_node_greatest_number_of_out().id == 0
+    graph.remove_node(1)
+    assert len(graph) == 2 and 1 not in graph[0].out and graph[2].entries.items() == [(0, 30)]
+    with pytest.raises(KeyError):
+        graph[1]
+    assert graph.get_node_with_smallest_number_of_entries().id == 0
+    assert graph[0].out.pop(2) == 30 and not graph[0].has_out
+    with pytest.raises(TypeError):
+        graph.add_node(graph[0])
+
+
+def test_compact_graph_lookup(reads):
+    # edges inserted in unsorted order of neighbours
+    graph = CompactGraph.from_edges(reads[:5], [(0, 3, 15), (0, 1, 45), (0, 4, 5), (2, 1, 10), (3, 1, 20)])
+    assert graph[0].out.keys() == [3, 1, 4] and graph[1].entries.keys() == [0, 2, 3]
+    assert [graph[0].out[node_id] for node_id in (1, 3, 4)] == [45, 15, 5] and 2 not in graph[0].out
+    assert graph[1].entries.pop(2) == 10 and 2 not in graph[1].entries and graph[1].entries[3] == 20
+    graph.remove_edges([(0, 3)])
+    assert 3 not in graph[0].out and 0 not in graph[3].entries and graph[0].out.items() == [(1, 45), (4, 5)]
+
+
+def test_compact_graph_same_layout(noisy_reads):
+    assert layout(overlap_naive(noisy_reads)) == layout(overlap_naive(noisy_reads, graph_type=CompactGraph))
+
+
+def test_node_queue(reads):
+    graph = Graph.from_edges(reads[:4], [(0, 1, 45), (1, 2, 45), (3, 2, 10)])
+    ids = [node.id for node in graph]
+    queue = NodeQueue(graph, key=lambda node: len(node.entries))
+    assert queue.pop().id == ids[0]
+    graph.remove_node(ids[0])
+    queue.update(graph[ids[1]].entries)
+    queue.update([ids[1]])
+    assert queue.pop().id == ids[1]
+    graph.remove_node(ids[1])
+    assert queue.pop().id == ids[3]
+
+
+def test_layout_contigs(noisy_reads, reads):
+    assert layout(overlap_naive(reads)) == [''.join([reads[0]] + [read[-15:] for read in reads[1:]])]
+    contigs = layout(overlap_naive(noisy_reads))
+    assert contigs and all(len(contig) >= 60 for contig in contigs)
+
+
+def test_olc_naive(reads):
+    assert olc_naive(reads) == [''.join([reads[0]] + [read[-15:] for read in reads[1:]])]
+
+
+@pytest.mark.parametrize('graph_type', [Graph, CompactGraph])
+def test_naive_graph_path_keeps_graph(noisy_reads, graph_type):
+    graph = overlap_naive(noisy_reads, graph_type=graph_type)
+    before = edges(graph)
+    paths = list(naive_graph_path(graph))
+    assert edges(graph) == before and len(graph) == len(noisy_reads)
+    assert paths == list(naive_graph_path(graph, workers=3))
+    assert paths == list(naive_graph_path(overlap_naive(noisy_reads)))
+    first = next(iter(graph))
+    assert naive_graph_path_staring_from_node(graph, first.id) == paths[0]
+
+
+@pytest.mark.parametrize('graph_type', [Graph, CompactGraph])
+def test_reduce_transitive_edges(reads, graph_type):
+    graph = graph_type.from_edges(reads[:4], [(0, 1, 45), (0, 2, 30), (1, 2, 45), (2, 3, 45), (1, 3, 30), (0, 3, 15)])
+    assert graph.reduce_transitive_edges().removed_edges == 3
+    assert edges(graph) == {(0, 1, 45), (1, 2, 45), (2, 3, 45)}
+
+
+def test_reduce_transitive_edges_same_start(reads):
+    graph = Graph.from_edges([reads[0], reads[0], reads[1]], [(0, 1, 60), (1, 0, 60), (0, 2, 45), (1, 2, 45)])
+    graph.reduce_transitive_edges()
+    assert edges(graph) == {(0, 1, 60), (1, 0, 60), (1, 2, 45)}
+
+
+def test_consensus(reads):
+    noisy = list(reads[:5])
+    error = 'A' if noisy[2][50] != 'A' else 'C'
+    noisy[2] = noisy[2][:50] + error + noisy[2][51:]
+    contig = Contig(noisy, [0, 15, 30, 45, 60])
+    expected = ''.join([reads[0]] + [read[-15:] for read in reads[1:5]])
+    assert contig.sequence == expected[:80] + error + expected[81:]
+    assert consensus([contig]) == [expected]
+
+
+@pytest.mark.parametrize('indel', ['insertion', 'deletion'])
+def test_consensus_realigns_reads(reads, indel):
+    noisy = list(reads[:5])
+    if indel == 'insertion':
+        noisy[2] = noisy[2][:50] + ('A' if noisy[2][50] != 'A' else 'C') + noisy[2][50:]
+        offsets = [0, 15, 30, 46, 61]
+    else:
+        noisy[2] = noisy[2][:50] + noisy[2][51:]
+        offsets = [0, 15, 30, 44, 59]
+    contig = Contig(noisy, offsets)
+    expected = ''.join([reads[0]] + [read[-15:] for read in reads[1:5]])
+    assert contig.sequence != expected
+    assert consensus([contig]) == [expected]
+
+
+def test_contig_with_contained_last_read(reads):
+    contig = Contig([reads[0], reads[1], reads[1][10:40]], [0, 15, 25])
+    assert contig.length == 75 and contig.sequence == reads[0] + reads[1][-15:]
+
+
+def test_layout_contigs_placements(reads):
+    contig, = layout_contigs(overlap_naive(reads))
+    assert contig.reads == reads and contig.offsets == list(range(0, 15 * len(reads), 15))
+    assert contig.numbers == list(range(len(reads)))
+
+
+def test_layout_contigs_scaffolds_by_mates():
+    rng = random.Random(0)
+    reference = ''.join(rng.choice('ACGT') for _ in range(1400))
+    reads, pairs = [], []
+    # no read covers 560:660, but inserts of 305 do
+    for start in range(0, 1400 - 305, 10):
+        first, second = (start, start + 60), (start + 245, start + 305)
+        if any(560 < end and begin < 660 for begin, end in (first, second)):
+            continue
+        pairs.append((len(reads), len(reads) + 1))
+        reads.extend([reference[slice(*first)], reference[slice(*second)]])
+    contigs = layout_contigs(overlap_naive(reads))
+    assert sorted(reference.index(contig.sequence) for contig in contigs) == [0, 660]
+    scaffold, = layout_contigs(overlap_naive(reads), [np.array(pairs)])
+    assert scaffold.sequence == reference[:560] + 'N' * 100 + reference[660:scaffold.length]
+    assert sorted(scaffold.numbers) == list(range(len(reads)))
+    assert consensus([scaffold]) == [scaffold.sequence]
@@ -0,0 +1,65 @@
+import multiprocessing
+import random
+from contextlib import closing
+
+import pytest
+
+from algorithms.error_corrections import CorrectedReads
+from algorithms.olc import overlap_naive, overlap_dynamic
+from parallel import parallel_map, shards, shared
+
+
+def _scaled(shard):
+    return [shared('factor') * number for number in range(*shard)]
+
+
+@pytest.fixture
+def reads(reference):
+    rng = random.Random(1)
+    reads = []
+    for _ in range(120):
+        start = rng.randrange(1000 - 50)
+        reads.append(''.join(c if rng.random() > 0.01 else rng.choice('ACGT') for c in reference[start:start + 50]))
+    return reads
+
+
+def edges(graph):
+    ids = {node.id: number for number, node in enumerate(graph)}
+    return [[(ids[out_id], weight) for out_id, weight in node.out.items()] for node in graph]
+
+
+def test_shards():
+    assert shards(0) == []
+    assert shards(3) == [(0, 1), (1, 2), (2, 3)]
+    assert [number for shard in shards(1000, 4) for number in range(*shard)] == list(range(1000))
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parallel_map(workers):
+    results = parallel_map(_scaled, shards(50, workers), workers, factor=2)
+    assert [number for result in results for number in result] == [2 * number for number in range(50)]
+
+
+def test_parallel_correction(reads):
+    single = CorrectedReads(reads, k=8)
+    parallel = CorrectedReads(reads, k=8, workers=3)
+    assert list(single) == list(parallel)
+    assert single.statistics == parallel.statistics
+
+
+@pytest.mark.parametrize('overlap', [overlap_naive, overlap_dynamic])
+def test_parallel_overlaps(reads, overlap):
+    assert edges(overlap(reads)) == edges(overlap(reads, workers=3))
+
+
+def test_spawned_workers_get_shared_objects(reads, monkeypatch):
+    monkeypatch.setattr(multiprocessing, 'Pool', multiprocessing.get_context('spawn').Pool)
+    assert edges(overlap_naive(reads)) == edges(overlap_naive(reads, workers=2))
+
+
+def test_closed_early():
+    results = parallel_map(_scaled, shards(50, 3), 3, factor=2)
+    with closing(results):
+        assert next(results) == [0]
+    with pytest.raises(KeyError):
+        shared('factor')
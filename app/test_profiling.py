@@ -0,0 +1,43 @@
+import json
+import os
+
+from assembly import assembly
+from bench.simulate import simulate_reads
+from io_utils import dump_output
+from profiling import Profiler, counter, profiling, stage
+
+
+def test_stages_and_counters(tmpdir):
+    profiler = Profiler(cprofile_dir=str(tmpdir))
+    with stage('ignored'):
+        counter('ignored', 1)
+    with profiling(profiler):
+        with stage('outer'):
+            counter('reads', 10)
+            with stage('inner'):
+                counter('nodes', 5)
+                sum(range(10000))
+        counter('contigs', 2)
+    with stage('ignored'):
+        pass
+    report = profiler.report()
+    assert [record['name'] for record in report['stages']] == ['outer', 'outer/inner']
+    assert [record['counters'] for record in report['stages']] == [{'reads': 10}, {'nodes': 5}]
+    assert report['counters'] == {'reads': 10, 'nodes': 5, 'contigs': 2}
+    outer, inner = report['stages']
+    assert outer['wall_seconds'] >= inner['wall_seconds'] >= 0 and outer['peak_rss'] > 0
+    assert os.listdir(str(tmpdir)) == ['outer.prof']
+
+
+def test_assembly_profile(tmpdir):
+    reads_file, profile_file = str(tmpdir.join('reads.fasta')), str(tmpdir.join('profile.json'))
+    dump_output(reads_file, simulate_reads(reference_length=1000, coverage=10, read_length=50, seed=0).reads)
+    assembly(reads_file, str(tmpdir.join('contigs.fasta')), 'OLC', error_correction=True,
+             profile_file_name=profile_file)
+    with open(profile_file) as f:
+        report = json.load(f)
+    names = [record['name'] for record in report['stages']]
+    assert names[:3] == ['parse', 'assembly', 'assembly/error_correction']
+    assert {'assembly/overlap', 'assembly/layout', 'assembly/consensus', 'output'} <= set(names)
+    assert report['counters']['reads'] == 200 and report['counters']['contigs'] >= 1
+    assert report['counters']['graph_nodes'] == 200
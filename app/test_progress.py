@@ -0,0 +1,77 @@
+import io
+import logging
+
+import progress
+from progress import LogReporter, Progress, configure, track
+
+
+class Recorder:
+    def __init__(self):
+        self.reports = []
+        self.finished = []
+
+    def report(self, state):
+        self.reports.append(state)
+
+    def finish(self, state):
+        self.finished.append(state)
+
+
+def test_reports_at_most_once_per_interval():
+    recorder = Recorder()
+    with Progress(100000, 'loop', recorder, interval=3600) as loop:
+        for i in range(100000):
+            loop.update(i)
+    assert recorder.reports == [] and recorder.finished == []
+
+    recorder = Recorder()
+    with Progress(100, 'loop', recorder, interval=0) as loop:
+        for i in range(1, 101):
+            loop.update(i)
+    assert recorder.reports and recorder.reports[-1].iteration <= 100
+    assert [state.iteration for state in recorder.finished] == [100]
+    state = recorder.reports[0]
+    assert state.description == 'loop' and state.total == 100 and state.eta >= 0
+
+
+def test_silent_mode_never_reads_clock():
+    configure('silent')
+    try:
+        loop = track(10, 'loop')
+        assert loop.reporter is None and loop._next_iteration == float('inf')
+        with loop:
+            for i in range(10):
+                loop.update(i)
+    finally:
+        configure()
+
+
+def test_log_reporter_attaches_state(caplog):
+    with caplog.at_level(logging.INFO, logger='progress'):
+        with Progress(4, 'Building graph', LogReporter(), interval=0) as loop:
+            loop.update(2)
+    first, last = caplog.records
+    assert first.progress['iteration'] == 2 and first.progress['total'] == 4
+    assert '50.0% (2/4)' in first.getMessage()
+    assert 'done' in last.getMessage()
+
+
+def test_terminal_reporter_bar():
+    stream = io.StringIO()
+    configure('bar', interval=0, stream=stream)
+    try:
+        with track(2, 'Walking') as loop:
+            loop.update(1)
+    finally:
+        configure()
+    first, last = stream.getvalue().split('\r')[1:]
+    assert first.startswith('Walking: |' + '█' * (progress.BAR_LENGTH // 2) + '-') and '50.0%' in first
+    assert last.startswith('Walking: |' + '█' * progress.BAR_LENGTH + '| 100.0% in 00:00') and last.endswith('\n')
+
+
+def test_auto_mode_logs_when_not_on_terminal():
+    configure('auto', stream=io.StringIO())
+    try:
+        assert isinstance(track(1, 'loop').reporter, LogReporter)
+    finally:
+        configure()
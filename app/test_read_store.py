@@ -0,0 +1,35 @@
+import numpy as np
+
+from algorithms.error_corrections import CorrectedReads
+from algorithms.scs import greedy_scs
+from read_store import ReadStore
+
+READS = ['ACGTTGCA', 'TTGCAGGA', '', 'CAGGATTACN']
+
+
+def test_read_store_sequence():
+    store = ReadStore.from_reads(READS)
+    assert len(store) == len(READS)
+    assert list(store) == READS
+    assert [store[i] for i in range(-len(READS), len(READS))] == READS + READS
+    assert list(store[1:3]) == READS[1:3]
+    assert list(store[::2]) == READS[::2]
+    assert store.lengths.tolist() == [len(read) for read in READS]
+    assert store.alphabet == set(''.join(READS))
+
+
+def test_read_store_views_share_buffer():
+    store = ReadStore.from_reads(READS)
+    view = store.view(3)
+    assert np.shares_memory(view, store.buffer)
+    assert store[1:][2] == READS[3]
+    assert store.encoded(0).tolist() == [0, 1, 2, 3, 3, 2, 1, 0]
+    assert store.encoded(3)[-1] == 255
+
+
+def test_algorithms_accept_read_store():
+    store = ReadStore.from_reads(['ACGTTGCA', 'TTGCAGGA', 'CAGGATTAC'])
+    assert greedy_scs(store, 3) == greedy_scs(list(store), 3)
+    corrected = CorrectedReads(store, k=3, threshold=0)
+    assert isinstance(corrected.corrected_reads, ReadStore)
+    assert list(corrected) == list(store)
@@ -0,0 +1,75 @@
+import itertools
+import random
+
+import pytest
+
+from algorithms.scs import greedy_scs, pick_maximal_overlap, scs, overlap
+
+
+def naive_greedy_scs(reads, k=5):
+    reads = list(reads)
+    read_a, read_b, olen = pick_maximal_overlap(reads, k)
+    while olen > 0:
+        reads.remove(read_a)
+        reads.remove(read_b)
+        reads.append(read_a + read_b[-(len(read_b) - olen):])
+        read_a, read_b, olen = pick_maximal_overlap(reads, k)
+    return ''.join(reads)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_greedy_scs_same_as_naive(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        reference = ''.join(rng.choice(rng.choice(['AC', 'ACGT'])) for _ in range(rng.randrange(5, 80)))
+        reads = []
+        for _ in range(rng.randrange(1, 12)):
+            start = rng.randrange(len(reference))
+            reads.append(reference[start:start + rng.randrange(0, 20)])
+        reads += reads[:rng.randrange(3)]
+        k = rng.randrange(1, 7)
+        assert greedy_scs(reads, k) == naive_greedy_scs(reads, k)
+
+
+def test_greedy_scs_reads():
+    rng = random.Random(0)
+    reference = ''.join(rng.choice('ACGT') for _ in range(1000))
+    reads = [reference[start:start + 50] for start in range(0, len(reference) - 49, 10)]
+    rng.shuffle(reads)
+    assert greedy_scs(reads, 10) == reference == naive_greedy_scs(reads, 10)
+
+
+def permutations_scs(ss):
+    shortest_sup = None
+    for ssperm in itertools.permutations(ss):
+        sup = ssperm[0]
+        for a, b in zip(ssperm, ssperm[1:]):
+            sup += b[overlap(a, b, min_length=1):]
+        if shortest_sup is None or len(sup) < len(shortest_sup):
+            shortest_sup = sup
+    return shortest_sup
+
+
+def test_scs_same_as_permutations():
+    rng = random.Random(0)
+    for _ in range(300):
+        reference = ''.join(rng.choice(rng.choice(['A', 'AC', 'ACGT'])) for _ in range(rng.randrange(3, 40)))
+        ss = []
+        for _ in range(rng.randrange(1, 7)):
+            start = rng.randrange(len(reference))
+            ss.append(reference[start:start + rng.randrange(0, 10)])
+        assert scs(ss) == permutations_scs(ss)
+
+
+def test_scs_many_strings():
+    rng = random.Random(1)
+    reference = ''.join(rng.choice('ACGT') for _ in range(200))
+    ss = [reference[start:start + 30] for start in range(0, 171, 13)] + [reference[170:]]
+    rng.shuffle(ss)
+    assert len(ss) == 15 and scs(ss) == reference
+
+
+def test_scs_falls_back_to_greedy():
+    ss = ['ACGTAC', 'GTACGG', 'CGGTTA', 'TTAACG']
+    assert scs(ss, memory_limit=100) == greedy_scs(ss, k=1)
+    assert len(scs(ss)) <= len(greedy_scs(ss, k=1))
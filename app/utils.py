@@ -1,6 +1,8 @@
-import sys
 from contextlib import contextmanager
 from time import time
+from typing import Sequence
+
+import numpy as np
 
 
 @contextmanager
@@ -10,27 +12,11 @@ def timing():
     print(f"Time consumed {time() - start}")
 
 
-# source: https://gist.github.com/aubricus/f91fb55dc6ba5557fbab06119420dd6a
-def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_length=100):
-    """
-    Call in a loop to create terminal progress bar
-    @params:
-        iteration   - Required  : current iteration (Int)
-        total       - Required  : total iterations (Int)
-        prefix      - Optional  : prefix string (Str)
-        suffix      - Optional  : suffix string (Str)
-        decimals    - Optional  : positive number of decimals in percent complete (Int)
-        bar_length  - Optional  : character length of bar (Int)
-    """
-    str_format = "{0:." + str(decimals) + "f}"
-    percents = str_format.format(100 * (iteration / float(total)))
-    filled_length = int(round(bar_length * iteration / float(total)))
-    bar = '█' * filled_length + '-' * (bar_length - filled_length)
-
-    sys.stdout.write('\r%s |%s| %s%s %s' % (prefix, bar, percents, '%', suffix)),
-
-    if iteration == total:
-        sys.stdout.write('\n')
-
-
-sys.stdout.flush()
+def n50(lengths: Sequence[int]) -> int:
+    """ Length of the shortest contig among the longest ones covering at
+        least half of total length """
+    lengths = np.sort(np.asarray(lengths, dtype=np.int64))[::-1]
+    if not len(lengths):
+        return 0
+    covered = np.cumsum(lengths)
+    return int(lengths[np.searchsorted(covered, covered[-1] / 2)])